@@ -1,8 +1,25 @@
+import functools
 import os
-from fastapi import FastAPI
+from typing import List, Optional
+
+from fastapi import Body, FastAPI, Query
+from fastapi.responses import StreamingResponse
+from pydantic import constr
+
+from src.api.responses import ORJSONResponse
+from src.utils.logger import setup_logger
+from web_agent import (
+    MAX_ANSWER_TOKENS,
+    MAX_OUTPUT_TOKENS,
+    WORKERS,
+    generate_batch_response,
+    generate_response,
+    stream_response,
+    warm_up,
+)
 
 # ✅ Initialize FastAPI
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 @app.get("/")
 def home():
@@ -11,10 +28,71 @@ def home():
 # ✅ Add the missing `/query` endpoint
 @app.get("/query")
 def get_response(query: str):
-    return {"response": f"You asked: {query}. Here's the best training 
-advice!"}
+    return {"response": f"You asked: {query}. Here's the best training advice!"}
+
+# ✅ Ask the trainer agent (async so concurrent requests share one event loop).
+# Everyday questions go to a fast model; `quality=high` always uses the larger one.
+# Answers are capped at `max_tokens` tokens (per question).
+# Empty or overlong questions are rejected (422) before any cache lookup or call.
+MAX_QUESTION_CHARS = 2000
+MAX_BATCH_QUESTIONS = 100
+Question = Query(..., min_length=1, max_length=MAX_QUESTION_CHARS)
+MaxTokens = Query(MAX_ANSWER_TOKENS, ge=1, le=MAX_OUTPUT_TOKENS)
+
+@app.get("/ask")
+async def ask(question: str = Question, quality: Optional[str] = None, max_tokens: int = MaxTokens):
+    return {"response": await generate_response(question, quality, max_tokens)}
+
+# ✅ Stream the answer token-by-token as Server-Sent Events (dropping the
+# connection stops the generation)
+@app.get("/ask/stream")
+async def ask_stream(question: str = Question, quality: Optional[str] = None, max_tokens: int = MaxTokens):
+    return StreamingResponse(stream_response(question, quality, max_tokens), media_type="text/event-stream")
+
+# ✅ Ask several questions at once (marshaled into as few LLM calls as possible).
+# Every question is held to the /ask limits, and at most MAX_BATCH_QUESTIONS
+# are accepted per request.
+BatchQuestion = constr(min_length=1, max_length=MAX_QUESTION_CHARS)
+
+@app.post("/ask_batch")
+async def ask_batch(
+    questions: List[BatchQuestion] = Body(..., max_length=MAX_BATCH_QUESTIONS),
+    quality: Optional[str] = None,
+    max_tokens: int = MaxTokens,
+):
+    return {"responses": await generate_batch_response(questions, quality, max_tokens)}
+
+# ✅ Debugging: Print Working Directory once per process, and only in development
+@functools.lru_cache(maxsize=None)
+def _startup_debug():
+    print(f"✅ Current Directory: {os.getcwd()}, 📂 Files: {os.listdir(os.getcwd())}")
+
+# ✅ Log through a background queue listener so handlers never block a request
+@app.on_event("startup")
+def startup_logging():
+    setup_logger(os.getenv("LOG_LEVEL", "INFO"), os.getenv("LOG_FILE"))
+
+# ✅ Open the OpenAI connection, check the key and size the rate limiter
+@app.on_event("startup")
+async def startup_openai():
+    app.state.rate_limits = await warm_up()
+
+@app.on_event("startup")
+def startup_debug():
+    if os.getenv("ENV") == "dev":
+        _startup_debug()
 
-# ✅ Debugging: Print Working Directory (One-Line Fix)
-print(f"✅ Current Directory: {os.getcwd()}, 📂 Files: 
-{os.listdir(os.getcwd())}")
+# ✅ Serve with one process per core (WEB_CONCURRENCY to override); uvloop and
+# httptools are used when installed (uvicorn[standard]). Workers share the
+# on-disk answer cache and split the OpenAI rate limits between them.
+if __name__ == "__main__":
+    import uvicorn
 
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "10000")),
+        workers=WORKERS,
+        loop="auto",
+        http="auto",
+    )
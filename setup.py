@@ -11,12 +11,15 @@ setup(
     install_requires=[
         "numpy>=1.20.0",
         "pandas>=1.3.0",
-        "scikit-learn>=1.0.0",
+        "scikit-learn>=1.2.0",
+        "scipy>=1.7.0",
         "matplotlib>=3.5.0",
         "seaborn>=0.11.0",
         "fastapi>=0.75.0",
         "uvicorn>=0.17.0",
-        "pydantic>=1.9.0",
+        "pydantic>=2.0.0",
+        "orjson>=3.10.0",
+        "msgspec>=0.18.0",
         "python-dotenv>=0.19.0",
         "requests>=2.27.0",
         "joblib>=1.1.0",
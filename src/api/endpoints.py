@@ -3,14 +3,20 @@ API endpoints for Horse Trainer AI
 
 This module defines the API endpoints for accessing the Horse Trainer AI functionality.
 """
+import asyncio
 import logging
+import time
 from datetime import date
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Type
 
-from fastapi import FastAPI, HTTPException, Query, Depends
+import msgspec
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
 
+from src.api.responses import ORJSONResponse
 from src.config import load_config
 from src.data.data_loader import DataLoader
 from src.models.horse_profile import HorseProfile, MedicalRecord, TrainingSession
@@ -22,7 +28,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Horse Trainer AI API",
     description="API for accessing Horse Trainer AI functionality",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -34,21 +41,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (e.g. the horse list). Added after CORS so it
+# wraps it and CORS headers are set on the uncompressed response
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Seconds to batch profile mutations before writing them to disk
+WRITE_DELAY = 0.1
+
+@app.on_event("startup")
+def create_shared_state():
+    """Create the data loader and training model shared by all requests."""
+    config = load_config("config/default.json")
+    # Only pretty-print the data files when debugging; compact JSON is smaller to write and parse
+    pretty = config.get('api', {}).get('debug', False)
+    app.state.data_loader = DataLoader(write_delay=WRITE_DELAY, pretty=pretty)
+    app.state.training_model = TrainingModel(config)
+    # Set once the model has been trained; the lock lets only one request train it
+    app.state.model_trained = asyncio.Event()
+    app.state.train_lock = asyncio.Lock()
+
+@app.on_event("shutdown")
+def flush_pending_writes():
+    """Write any batched profile changes to disk before the server exits."""
+    app.state.data_loader.flush()
+
 # Dependency for getting the data loader
-def get_data_loader():
-    """Get the data loader instance."""
-    return DataLoader()
+def get_data_loader(request: Request) -> DataLoader:
+    """Get the shared data loader instance (its profile cache persists across requests)."""
+    return request.app.state.data_loader
+
+async def load_horse_index(data_loader: DataLoader):
+    """
+    Load the horse profile index without blocking the event loop.
+    
+    Parsing (only needed when the file changed) runs in the threadpool; the
+    index is then taken from the warm cache on the loop, so handlers that
+    modify it have no await between reading and saving it.
+    """
+    await run_in_threadpool(data_loader.load_horse_index)
+    return data_loader.load_horse_index()
+
+# Seconds a horse ID that was not found keeps answering 404 without a lookup
+MISSING_HORSE_TTL = 1.0
+MAX_MISSING_HORSES = 10000
+
+# Horse ID -> time.monotonic() until which it is known to be missing
+_missing_horses: Dict[str, float] = {}
+
+def _check_missing_horse(horse_id: str) -> None:
+    """Raise a 404 for a horse ID that was recently not found."""
+    expiry = _missing_horses.get(horse_id)
+    if expiry is None:
+        return
+    if expiry > time.monotonic():
+        raise HTTPException(status_code=404, detail=f"Horse with ID {horse_id} not found")
+    _missing_horses.pop(horse_id, None)
+
+def _horse_not_found(horse_id: str) -> HTTPException:
+    """Remember a horse ID as missing and build its 404."""
+    now = time.monotonic()
+    if len(_missing_horses) >= MAX_MISSING_HORSES:
+        for missing_id, expiry in list(_missing_horses.items()):
+            if expiry <= now:
+                del _missing_horses[missing_id]
+    if len(_missing_horses) < MAX_MISSING_HORSES:
+        _missing_horses[horse_id] = now + MISSING_HORSE_TTL
+    return HTTPException(status_code=404, detail=f"Horse with ID {horse_id} not found")
 
 # Dependency for getting the training model
-def get_training_model():
-    """Get the training model instance."""
-    config = load_config("config/default.json")
-    return TrainingModel(config)
+def get_training_model(request: Request) -> TrainingModel:
+    """Get the shared training model instance (trained once, on first use)."""
+    return request.app.state.training_model
 
 # Pydantic models for request/response validation
 class TrainingSessionModel(BaseModel):
     """Pydantic model for a training session."""
-    date: str
+    date: date
     activity_type: str
     duration_minutes: int
     intensity: str
@@ -57,7 +125,7 @@ class TrainingSessionModel(BaseModel):
 
 class MedicalRecordModel(BaseModel):
     """Pydantic model for a medical record."""
-    date: str
+    date: date
     condition: str
     treatment: str
     notes: Optional[str] = None
@@ -67,7 +135,7 @@ class HorseProfileModel(BaseModel):
     id: str
     name: str
     breed: str
-    birth_date: str
+    birth_date: date
     sex: str
     color: str
     height_hands: float
@@ -77,6 +145,68 @@ class HorseProfileModel(BaseModel):
     medical_history: List[MedicalRecordModel] = Field(default_factory=list)
     training_history: List[TrainingSessionModel] = Field(default_factory=list)
 
+# msgspec structs mirroring the models above. The write endpoints decode their
+# bodies with these, which is several times faster than Pydantic; the models
+# still describe the bodies in the OpenAPI schema.
+class TrainingSessionStruct(msgspec.Struct):
+    """Request body for a training session."""
+    date: date
+    activity_type: str
+    duration_minutes: int
+    intensity: str
+    performance_rating: int
+    notes: Optional[str] = None
+
+class MedicalRecordStruct(msgspec.Struct):
+    """Request body for a medical record."""
+    date: date
+    condition: str
+    treatment: str
+    notes: Optional[str] = None
+
+class HorseProfileStruct(msgspec.Struct):
+    """Request body for a horse profile."""
+    id: str
+    name: str
+    breed: str
+    birth_date: date
+    sex: str
+    color: str
+    height_hands: float
+    weight_kg: float
+    lineage: Dict[str, str] = msgspec.field(default_factory=dict)
+    dietary_restrictions: List[str] = msgspec.field(default_factory=list)
+    medical_history: List[MedicalRecordStruct] = msgspec.field(default_factory=list)
+    training_history: List[TrainingSessionStruct] = msgspec.field(default_factory=list)
+
+def request_body_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenAPI request body for an endpoint that decodes its own body as `model`."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"$ref": f"#/components/schemas/{model.__name__}"}}
+            }
+        }
+    }
+
+async def decode_body(request: Request, struct_type: Type[msgspec.Struct]) -> Any:
+    """
+    Decode and validate a JSON request body with msgspec.
+    
+    Args:
+        request: Incoming request
+        struct_type: Struct describing the expected body
+        
+    Returns:
+        Decoded body
+    """
+    try:
+        # Lax mode coerces e.g. "5" to 5, like Pydantic does
+        return msgspec.json.decode(await request.body(), type=struct_type, strict=False)
+    except msgspec.DecodeError as e:  # Includes msgspec.ValidationError
+        raise HTTPException(status_code=422, detail=str(e))
+
 class TrainingRecommendationModel(BaseModel):
     """Pydantic model for a training recommendation."""
     horse_id: str
@@ -97,8 +227,8 @@ async def root():
         "description": "API for accessing Horse Trainer AI functionality"
     }
 
-@app.get("/horses", response_model=List[HorseProfileModel])
-async def get_horses(data_loader: DataLoader = Depends(get_data_loader)):
+@app.get("/horses", responses={200: {"model": List[HorseProfileModel]}})
+async def get_horses(data_loader: DataLoader = Depends(get_data_loader)) -> Response:
     """
     Get all horse profiles.
     
@@ -106,17 +236,17 @@ async def get_horses(data_loader: DataLoader = Depends(get_data_loader)):
         List of horse profiles
     """
     try:
-        profiles = data_loader.load_horse_profiles()
-        return [profile.to_dict() for profile in profiles]
+        payload = await run_in_threadpool(data_loader.load_horse_profiles_json)
+        return Response(content=payload, media_type="application/json")
     except Exception as e:
         logger.error(f"Error getting horse profiles: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/horses/{horse_id}", response_model=HorseProfileModel)
+@app.get("/horses/{horse_id}", responses={200: {"model": HorseProfileModel}})
 async def get_horse(
     horse_id: str,
     data_loader: DataLoader = Depends(get_data_loader)
-):
+) -> Response:
     """
     Get a specific horse profile by ID.
     
@@ -127,88 +257,104 @@ async def get_horse(
         Horse profile
     """
     try:
-        profiles = data_loader.load_horse_profiles()
-        for profile in profiles:
-            if profile.id == horse_id:
-                return profile.to_dict()
+        _check_missing_horse(horse_id)
+        payload = await run_in_threadpool(data_loader.load_horse_profile_json, horse_id)
+        if payload is None:
+            raise _horse_not_found(horse_id)
         
-        raise HTTPException(status_code=404, detail=f"Horse with ID {horse_id} not found")
+        return Response(content=payload, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting horse profile: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/horses", response_model=HorseProfileModel)
+@app.post(
+    "/horses",
+    responses={200: {"model": HorseProfileModel}},
+    openapi_extra=request_body_schema(HorseProfileModel)
+)
 async def create_horse(
-    horse: HorseProfileModel,
+    request: Request,
     data_loader: DataLoader = Depends(get_data_loader)
-):
+) -> Response:
     """
     Create a new horse profile.
     
     Args:
-        horse: Horse profile data
+        request: Request whose body is the horse profile data
         
     Returns:
         Created horse profile
     """
+    horse = await decode_body(request, HorseProfileStruct)
     try:
         # Load existing profiles
-        profiles = data_loader.load_horse_profiles()
+        index = await load_horse_index(data_loader)
         
         # Check if horse ID already exists
-        for profile in profiles:
-            if profile.id == horse.id:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Horse with ID {horse.id} already exists"
-                )
+        if horse.id in index:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Horse with ID {horse.id} already exists"
+            )
         
         # Create new horse profile
-        new_profile = HorseProfile.from_dict(horse.dict())
-        profiles.append(new_profile)
+        new_profile = HorseProfile.from_dict(msgspec.to_builtins(horse))
+        data_loader.upsert_horse_profile(new_profile)
+        _missing_horses.clear()
         
-        # Save profiles
-        data_loader.save_horse_profiles(profiles)
-        
-        return new_profile.to_dict()
+        # The body was validated on the way in, so skip response validation
+        return Response(content=data_loader.load_horse_profile_json(new_profile.id), media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error creating horse profile: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/horses/{horse_id}", response_model=HorseProfileModel)
+@app.put(
+    "/horses/{horse_id}",
+    responses={200: {"model": HorseProfileModel}},
+    openapi_extra=request_body_schema(HorseProfileModel)
+)
 async def update_horse(
     horse_id: str,
-    horse: HorseProfileModel,
+    request: Request,
     data_loader: DataLoader = Depends(get_data_loader)
-):
+) -> Response:
     """
     Update a horse profile.
     
     Args:
         horse_id: ID of the horse to update
-        horse: Updated horse profile data
+        request: Request whose body is the updated horse profile data
         
     Returns:
         Updated horse profile
     """
+    horse = await decode_body(request, HorseProfileStruct)
     try:
+        _check_missing_horse(horse_id)
+        
         # Load existing profiles
-        profiles = data_loader.load_horse_profiles()
+        index = await load_horse_index(data_loader)
+        if horse_id not in index:
+            raise _horse_not_found(horse_id)
         
-        # Find horse profile to update
-        for i, profile in enumerate(profiles):
-            if profile.id == horse_id:
-                # Update profile
-                profiles[i] = HorseProfile.from_dict(horse.dict())
-                
-                # Save profiles
-                data_loader.save_horse_profiles(profiles)
-                
-                return profiles[i].to_dict()
+        # Changing the ID to that of another horse would replace that horse
+        if horse.id != horse_id and horse.id in index:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Horse with ID {horse.id} already exists"
+            )
         
-        raise HTTPException(status_code=404, detail=f"Horse with ID {horse_id} not found")
+        # Update profile (it keeps its position)
+        updated_profile = HorseProfile.from_dict(msgspec.to_builtins(horse))
+        data_loader.upsert_horse_profile(updated_profile, horse_id=horse_id)
+        _missing_horses.clear()
+        
+        # The body was validated on the way in, so skip response validation
+        return Response(content=data_loader.load_horse_profile_json(updated_profile.id), media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
@@ -230,79 +376,72 @@ async def delete_horse(
         Success message
     """
     try:
-        # Load existing profiles
-        profiles = data_loader.load_horse_profiles()
+        _check_missing_horse(horse_id)
         
-        # Find horse profile to delete
-        for i, profile in enumerate(profiles):
-            if profile.id == horse_id:
-                # Remove profile
-                profiles.pop(i)
-                
-                # Save profiles
-                data_loader.save_horse_profiles(profiles)
-                
-                return {"message": f"Horse with ID {horse_id} deleted successfully"}
+        # Load existing profiles, then remove this one
+        await load_horse_index(data_loader)
+        if not data_loader.delete_horse_profile(horse_id):
+            raise _horse_not_found(horse_id)
         
-        raise HTTPException(status_code=404, detail=f"Horse with ID {horse_id} not found")
+        return {"message": f"Horse with ID {horse_id} deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error deleting horse profile: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/training/{horse_id}", response_model=TrainingSessionModel)
+@app.post(
+    "/training/{horse_id}",
+    responses={200: {"model": TrainingSessionModel}},
+    openapi_extra=request_body_schema(TrainingSessionModel)
+)
 async def add_training_session(
     horse_id: str,
-    session: TrainingSessionModel,
+    request: Request,
     data_loader: DataLoader = Depends(get_data_loader)
-):
+) -> Response:
     """
     Add a training session to a horse's history.
     
     Args:
         horse_id: ID of the horse
-        session: Training session data
+        request: Request whose body is the training session data
         
     Returns:
         Added training session
     """
+    session = await decode_body(request, TrainingSessionStruct)
     try:
-        # Load existing profiles
-        profiles = data_loader.load_horse_profiles()
+        _check_missing_horse(horse_id)
         
-        # Find horse profile
-        for profile in profiles:
-            if profile.id == horse_id:
-                # Add training session
-                new_session = TrainingSession(
-                    date=date.fromisoformat(session.date),
-                    activity_type=session.activity_type,
-                    duration_minutes=session.duration_minutes,
-                    intensity=session.intensity,
-                    performance_rating=session.performance_rating,
-                    notes=session.notes
-                )
-                profile.training_history.append(new_session)
-                
-                # Save profiles
-                data_loader.save_horse_profiles(profiles)
-                
-                return session
+        # Add training session
+        new_session = TrainingSession(
+            date=session.date,
+            activity_type=session.activity_type,
+            duration_minutes=session.duration_minutes,
+            intensity=session.intensity,
+            performance_rating=session.performance_rating,
+            notes=session.notes
+        )
+        await load_horse_index(data_loader)
+        if not data_loader.append_training_session(horse_id, new_session):
+            raise _horse_not_found(horse_id)
         
-        raise HTTPException(status_code=404, detail=f"Horse with ID {horse_id} not found")
+        # The body was validated on the way in, so skip response validation
+        return ORJSONResponse(content=msgspec.to_builtins(session))
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error adding training session: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/recommendations", response_model=List[TrainingRecommendationModel])
+@app.get("/recommendations", responses={200: {"model": List[TrainingRecommendationModel]}})
 async def get_recommendations(
+    request: Request,
     horse_id: Optional[str] = None,
     data_loader: DataLoader = Depends(get_data_loader),
     model: TrainingModel = Depends(get_training_model)
-):
+) -> Response:
     """
     Get training recommendations for horses.
     
@@ -314,25 +453,31 @@ async def get_recommendations(
     """
     try:
         # Load horse profiles
-        profiles = data_loader.load_horse_profiles()
+        index = await load_horse_index(data_loader)
+        profiles = list(index.values())
         
         # Filter profiles if horse_id is provided
         if horse_id:
-            profiles = [profile for profile in profiles if profile.id == horse_id]
-            if not profiles:
+            if horse_id not in index:
                 raise HTTPException(status_code=404, detail=f"Horse with ID {horse_id} not found")
+            profiles = [index[horse_id]]
         
-        # Load training data
-        training_data = data_loader.load_training_data()
-        
-        # Train model if not already trained
-        if not hasattr(model, 'model') or model.model is None:
-            model.train(training_data, profiles)
+        # Train model if not already trained. The model is shared across
+        # requests, so it is trained on every horse rather than the filtered ones.
+        # Requests arriving during training wait for it instead of training again.
+        trained = request.app.state.model_trained
+        if not trained.is_set():
+            async with request.app.state.train_lock:
+                if not trained.is_set():
+                    training_data = await run_in_threadpool(data_loader.load_training_data)
+                    await run_in_threadpool(model.train, training_data, list(index.values()))
+                    trained.set()
         
-        # Generate recommendations
-        recommendations = model.generate_recommendations(profiles)
+        # Generate recommendations (feature extraction and prediction are CPU
+        # bound, so they run in the threadpool like training)
+        recommendations = await run_in_threadpool(model.generate_recommendations, profiles)
         
-        return recommendations
+        return ORJSONResponse(content=recommendations)
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,26 @@
+"""
+Response classes for Horse Trainer AI
+
+This module provides response classes shared by the FastAPI applications.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+def _default(obj: Any) -> Any:
+    """Serialize objects orjson does not handle natively (e.g. HorseProfile)."""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib json module."""
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the response content to JSON bytes."""
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
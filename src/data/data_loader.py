@@ -3,64 +3,314 @@ Data Loader for Horse Trainer AI
 
 This module handles loading and processing data for the Horse Trainer AI application.
 """
-import json
+import dataclasses
 import logging
 import os
+import threading
 from datetime import date
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
 
+import msgspec
+import orjson
 import pandas as pd
 
-from src.models.horse_profile import HorseProfile
+from src.models.horse_profile import HorseProfile, TrainingSession
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # CSV files are read with pandas instead
+    pa = None
+    pacsv = None
 
 logger = logging.getLogger(__name__)
 
+def _atomic_write(file_path: str, data: bytes) -> None:
+    """Write a file via a temporary file so readers never see a partial write."""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+class _WriteScheduler:
+    """
+    Coalesces bursts of writes into one delayed flush per file.
+    
+    Each scheduled write only records how to render the file; the newest
+    render for a path replaces any older pending one, so N saves within the
+    delay cost a single serialization and disk write.
+    """
+    
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.dirty = False
+        self._pending: Dict[str, Tuple[Callable[[], bytes], Callable[[], None]]] = {}
+        self._timer: Optional[threading.Timer] = None
+        # _lock only guards the pending writes, so scheduling never waits on a
+        # write in progress; _flush_lock keeps flushes (and their writes) in order
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+    
+    def schedule(self, file_path: str, render: Callable[[], bytes], on_written: Callable[[], None]) -> None:
+        """
+        Schedule `file_path` to be written with the output of `render`.
+        
+        Args:
+            file_path: Path of the file to write
+            render: Produces the file contents at flush time
+            on_written: Called after the file has been replaced on disk
+        """
+        with self._lock:
+            self._pending[file_path] = (render, on_written)
+            self.dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def flush(self) -> None:
+        """Write all pending files now."""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending = self._pending, {}
+                self.dirty = False
+            
+            for file_path, (render, on_written) in pending.items():
+                try:
+                    _atomic_write(file_path, render())
+                    on_written()
+                except Exception as e:
+                    logger.error(f"Error writing file: {file_path} - {str(e)}")
+
+class _SerializedProfiles:
+    """
+    Serialized JSON payloads for one version of a profile index.
+    
+    A new instance is created whenever the index is replaced (on save or when
+    the file changes), which is what invalidates the payloads.
+    """
+    
+    def __init__(self, index: Dict[str, HorseProfile], horses: Optional[Dict[str, bytes]] = None):
+        self.index = index
+        self._payload: Optional[bytes] = None
+        self._horses: Dict[str, bytes] = {} if horses is None else horses
+    
+    def derive(self, index: Dict[str, HorseProfile], changed: Iterable[str]) -> '_SerializedProfiles':
+        """Payloads for a new index that differs from this one only in `changed` IDs."""
+        horses = dict(self._horses)
+        for horse_id in changed:
+            horses.pop(horse_id, None)
+        return _SerializedProfiles(index, horses)
+    
+    def get(self, horse_id: str) -> Optional[bytes]:
+        """Serialize one profile, or return None if it is not in the index."""
+        payload = self._horses.get(horse_id)
+        if payload is None:
+            profile = self.index.get(horse_id)
+            if profile is None:
+                return None
+            payload = self._horses[horse_id] = profile.to_json()
+        return payload
+    
+    def all(self) -> bytes:
+        """Serialize every profile as a JSON array, reusing per-profile payloads."""
+        if self._payload is None:
+            self._payload = b"[" + b",".join(self.get(horse_id) for horse_id in self.index) + b"]"
+        return self._payload
+
 class DataLoader:
     """
     Data Loader class for loading and processing horse training data.
     """
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", write_delay: float = 0.0, pretty: bool = False):
         """
         Initialize the data loader.
         
         Args:
             data_dir: Directory containing the data files
+            write_delay: Seconds to batch profile saves before writing them to
+                disk. If 0, saves are written immediately.
+            pretty: Indent the JSON files written (larger, but easier to read)
         """
         self.data_dir = data_dir
+        self.write_delay = write_delay
+        self._json_option = orjson.OPT_INDENT_2 if pretty else 0
+        # Parsed profiles per file, indexed by horse ID (in file order) and tagged
+        # with the (source path, mtime_ns, size) they were read at, or None
+        # while a save of them is still pending
+        self._profiles_cache: Dict[str, Tuple[Optional[Tuple[str, int, int]], Dict[str, HorseProfile]]] = {}
+        self._cache_lock = threading.RLock()
+        # Serialized JSON for the cached profiles, rebuilt when their index changes
+        self._json_cache: Dict[str, _SerializedProfiles] = {}
+        self._writer = _WriteScheduler(write_delay)
         self._ensure_data_dir()
     
     def _ensure_data_dir(self) -> None:
         """Create the data directory if it doesn't exist."""
         os.makedirs(self.data_dir, exist_ok=True)
     
-    def load_horse_profiles(self, filename: str = "horse_profiles.json") -> List[HorseProfile]:
+    @staticmethod
+    def _file_version(file_path: str) -> Tuple[int, int]:
+        """Identify the current version of a file by its mtime and size."""
+        st = os.stat(file_path)
+        return st.st_mtime_ns, st.st_size
+    
+    @staticmethod
+    def _binary_path(file_path: str) -> str:
+        """Path of the msgpack file storing the profiles named by a JSON file."""
+        return os.path.splitext(file_path)[0] + ".msgpack"
+    
+    def _source_version(self, file_path: str) -> Tuple[str, int, int]:
         """
-        Load horse profiles from a JSON file.
+        Identify the file profiles are read from and its current version.
+        
+        Whichever of the msgpack and JSON files was modified last is read, so
+        the JSON file is read until the profiles are first saved (which writes
+        msgpack), and again whenever it is edited after that.
+        """
+        binary_path = self._binary_path(file_path)
+        try:
+            binary_version = (binary_path,) + self._file_version(binary_path)
+        except FileNotFoundError:
+            return (file_path,) + self._file_version(file_path)
+        try:
+            json_version = (file_path,) + self._file_version(file_path)
+        except FileNotFoundError:
+            return binary_version
+        return json_version if json_version[1] > binary_version[1] else binary_version
+    
+    @staticmethod
+    def _read_profiles(source: str, binary: bool) -> Dict[str, HorseProfile]:
+        """Parse a msgpack (`binary`) or JSON profiles file into an index by horse ID."""
+        with open(source, 'rb') as f:
+            raw = f.read()
+        data = msgspec.msgpack.decode(raw) if binary else orjson.loads(raw)
+        
+        # Convert dictionaries to HorseProfile objects
+        index = {}
+        for profile_data in data:
+            profile = HorseProfile.from_dict(profile_data)
+            index[profile.id] = profile
+        return index
+    
+    def _load_index(self, file_path: str) -> Dict[str, HorseProfile]:
+        """Return the cached profile index for a file, re-parsing it if it changed."""
+        cached = self._profiles_cache.get(file_path)
+        if cached is not None and cached[0] is None:
+            # Saved but not flushed yet: memory is newer than the file
+            return cached[1]
+        
+        source = file_path
+        try:
+            version = self._source_version(file_path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            
+            source = version[0]
+            try:
+                index = self._read_profiles(source, binary=source != file_path)
+            except msgspec.DecodeError:
+                if source == file_path:
+                    raise
+                # A corrupt msgpack file must not hide the JSON profiles (and
+                # be replaced by an empty index on the next save)
+                logger.error(f"Error parsing horse profiles file: {source}; reading {file_path} instead")
+                source = file_path
+                version = (file_path,) + self._file_version(file_path)
+                index = self._read_profiles(source, binary=False)
+            with self._cache_lock:
+                current = self._profiles_cache.get(file_path)
+                if current is not None and current[0] is None:
+                    # A save landed while parsing; it is newer than what we read
+                    return current[1]
+                self._profiles_cache[file_path] = (version, index)
+            logger.debug("Loaded %d horse profiles from %s", len(index), source)
+            return index
+            
+        except FileNotFoundError:
+            logger.warning(f"Horse profiles file not found: {file_path}")
+            return {}
+        except (orjson.JSONDecodeError, msgspec.DecodeError):
+            logger.error(f"Error parsing horse profiles file: {source}")
+            return {}
+    
+    def load_horse_index(self, filename: str = "horse_profiles.json") -> Mapping[str, HorseProfile]:
+        """
+        Load horse profiles from a JSON file, indexed by horse ID.
+        
+        Once profiles have been saved they are read from the msgpack file next
+        to `filename` instead (see save_horse_profiles), unless the JSON file
+        was modified after it or it cannot be decoded. Parsed profiles are
+        cached until the file changes on disk. The mapping
+        is a read-only view in file order; the HorseProfile objects are shared
+        with the cache, so callers that mutate a profile must save it with
+        save_horse_profiles.
         
         Args:
             filename: Name of the JSON file containing horse profiles
             
         Returns:
-            List of HorseProfile objects
+            Read-only mapping of horse ID to HorseProfile
         """
+        return MappingProxyType(self._load_index(os.path.join(self.data_dir, filename)))
+    
+    def _serialized(self, filename: str) -> "_SerializedProfiles":
+        """Return the serialized-payload cache for the current version of a file."""
         file_path = os.path.join(self.data_dir, filename)
+        index = self._load_index(file_path)
         
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+        entry = self._json_cache.get(file_path)
+        if entry is None or entry.index is not index:
+            entry = _SerializedProfiles(index)
+            self._json_cache[file_path] = entry
+        return entry
+    
+    def load_horse_profiles_json(self, filename: str = "horse_profiles.json") -> bytes:
+        """
+        Load all horse profiles as a serialized JSON array.
+        
+        The bytes are built once per version of the profiles and reused until
+        they change, so repeated reads skip serialization entirely.
+        
+        Args:
+            filename: Name of the JSON file containing horse profiles
             
-            # Convert dictionaries to HorseProfile objects
-            profiles = [HorseProfile.from_dict(profile_data) for profile_data in data]
-            logger.info(f"Loaded {len(profiles)} horse profiles from {file_path}")
-            return profiles
+        Returns:
+            JSON array of horse profiles
+        """
+        return self._serialized(filename).all()
+    
+    def load_horse_profile_json(self, horse_id: str, filename: str = "horse_profiles.json") -> Optional[bytes]:
+        """
+        Load a single horse profile as serialized JSON.
+        
+        Args:
+            horse_id: ID of the horse
+            filename: Name of the JSON file containing horse profiles
             
-        except FileNotFoundError:
-            logger.warning(f"Horse profiles file not found: {file_path}")
-            return []
-        except json.JSONDecodeError:
-            logger.error(f"Error parsing horse profiles file: {file_path}")
-            return []
+        Returns:
+            JSON object for the horse profile, or None if it does not exist
+        """
+        return self._serialized(filename).get(horse_id)
+    
+    def load_horse_profiles(self, filename: str = "horse_profiles.json") -> List[HorseProfile]:
+        """
+        Load horse profiles from a JSON file.
+        
+        See load_horse_index for caching behaviour.
+        
+        Args:
+            filename: Name of the JSON file containing horse profiles
+            
+        Returns:
+            List of HorseProfile objects
+        """
+        return list(self.load_horse_index(filename).values())
     
     def load_training_data(self, filename: str = "training_data.json") -> List[Dict]:
         """
@@ -75,16 +325,16 @@ class DataLoader:
         file_path = os.path.join(self.data_dir, filename)
         
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                data = orjson.loads(f.read())
             
-            logger.info(f"Loaded {len(data)} training records from {file_path}")
+            logger.debug("Loaded %d training records from %s", len(data), file_path)
             return data
             
         except FileNotFoundError:
             logger.warning(f"Training data file not found: {file_path}")
             return []
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Error parsing training data file: {file_path}")
             return []
     
@@ -101,12 +351,15 @@ class DataLoader:
         file_path = os.path.join(self.data_dir, filename)
         
         try:
-            df = pd.read_csv(file_path)
+            if pacsv is not None:
+                data = self._read_csv_records(file_path)
+            else:
+                df = pd.read_csv(file_path)
+                
+                # Convert DataFrame to list of dictionaries
+                data = df.to_dict(orient='records')
             
-            # Convert DataFrame to list of dictionaries
-            data = df.to_dict(orient='records')
-            
-            logger.info(f"Loaded {len(data)} training records from {file_path}")
+            logger.debug("Loaded %d training records from %s", len(data), file_path)
             return data
             
         except FileNotFoundError:
@@ -116,23 +369,170 @@ class DataLoader:
             logger.error(f"Error loading training data CSV file: {file_path} - {str(e)}")
             return []
     
+    @staticmethod
+    def _read_csv_records(file_path: str) -> List[Dict]:
+        """
+        Read a CSV file into records with pyarrow.
+        
+        The columnar table converts straight to Python rows without building a
+        DataFrame first. Dates are kept as ISO strings, as in the JSON data.
+        """
+        table = pacsv.read_csv(file_path)
+        schema = pa.schema([
+            pa.field(f.name, pa.string()) if pa.types.is_temporal(f.type) else f
+            for f in table.schema
+        ])
+        return table.cast(schema).to_pylist()
+    
     def save_horse_profiles(self, profiles: List[HorseProfile], filename: str = "horse_profiles.json") -> None:
         """
-        Save horse profiles to a JSON file.
+        Save horse profiles.
+        
+        Profiles are stored as msgpack next to `filename` (e.g.
+        horse_profiles.msgpack), which is smaller and faster to parse than
+        JSON; the JSON file is left untouched, and only read again if it is
+        modified after the save.
+        
+        The cache is updated immediately. With a write_delay the file itself is
+        written later, together with any other saves made in the meantime;
+        call flush to write it right away.
         
         Args:
             profiles: List of HorseProfile objects
-            filename: Name of the JSON file to save
+            filename: Name of the JSON file naming the profiles
         """
         file_path = os.path.join(self.data_dir, filename)
+        self._store_index(file_path, {profile.id: profile for profile in profiles})
+    
+    def _store_index(self, file_path: str, index: Dict[str, HorseProfile], changed: Optional[Iterable[str]] = None) -> None:
+        """
+        Replace the cached profiles for a file and write (or schedule) them.
+        
+        Args:
+            file_path: Path of the JSON file naming the profiles
+            index: New profile index; it must not be modified afterwards
+            changed: IDs that differ from the current index, if known, so the
+                serialized payloads of the other profiles can be kept
+        """
+        binary_path = self._binary_path(file_path)
         
-        # Convert HorseProfile objects to dictionaries
-        data = [profile.to_dict() for profile in profiles]
+        def render() -> bytes:
+            data = [profile.to_encodable() for profile in index.values()]
+            return msgspec.msgpack.encode(data)
         
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        def on_written() -> None:
+            with self._cache_lock:
+                current = self._profiles_cache.get(file_path)
+                if current is not None and current[1] is index:
+                    self._profiles_cache[file_path] = ((binary_path,) + self._file_version(binary_path), index)
+            logger.debug("Saved %d horse profiles to %s", len(index), binary_path)
         
-        logger.info(f"Saved {len(profiles)} horse profiles to {file_path}")
+        with self._cache_lock:
+            cached = self._profiles_cache.get(file_path)
+            serialized = self._json_cache.get(file_path)
+            if changed is not None and cached is not None and serialized is not None and serialized.index is cached[1]:
+                self._json_cache[file_path] = serialized.derive(index, changed)
+            self._profiles_cache[file_path] = (None, index)
+        
+        if self.write_delay > 0:
+            self._writer.schedule(binary_path, render, on_written)
+        else:
+            _atomic_write(binary_path, render())
+            on_written()
+    
+    def upsert_horse_profile(self,
+                             profile: HorseProfile,
+                             horse_id: Optional[str] = None,
+                             filename: str = "horse_profiles.json") -> None:
+        """
+        Add a horse profile, or replace an existing one in place.
+        
+        Unlike save_horse_profiles, only the changed profile is touched in the
+        cache; the file is still rewritten (batched by write_delay).
+        
+        Args:
+            profile: Profile to store
+            horse_id: ID of the profile being replaced, if it differs from
+                profile.id (the profile keeps the replaced one's position)
+            filename: Name of the JSON file naming the profiles
+            
+        Raises:
+            ValueError: If profile.id differs from horse_id and names
+                another existing profile
+        """
+        file_path = os.path.join(self.data_dir, filename)
+        with self._cache_lock:
+            index = self._load_index(file_path)
+            if horse_id is not None and horse_id != profile.id and profile.id in index:
+                raise ValueError(f"Horse with ID {profile.id} already exists")
+            if horse_id is None or horse_id == profile.id:
+                updated = dict(index)
+                updated[profile.id] = profile
+                changed = [profile.id]
+            else:
+                updated = {}
+                for key, value in index.items():
+                    if key == horse_id:
+                        updated[profile.id] = profile
+                    else:
+                        updated[key] = value
+                changed = [horse_id, profile.id]
+            self._store_index(file_path, updated, changed)
+    
+    def delete_horse_profile(self, horse_id: str, filename: str = "horse_profiles.json") -> bool:
+        """
+        Delete a horse profile.
+        
+        Args:
+            horse_id: ID of the horse to delete
+            filename: Name of the JSON file naming the profiles
+            
+        Returns:
+            True if the profile existed
+        """
+        file_path = os.path.join(self.data_dir, filename)
+        with self._cache_lock:
+            index = self._load_index(file_path)
+            if horse_id not in index:
+                return False
+            updated = dict(index)
+            del updated[horse_id]
+            self._store_index(file_path, updated, [horse_id])
+            return True
+    
+    def append_training_session(self,
+                                horse_id: str,
+                                session: TrainingSession,
+                                filename: str = "horse_profiles.json") -> bool:
+        """
+        Append a training session to a horse's history.
+        
+        Args:
+            horse_id: ID of the horse
+            session: Training session to append
+            filename: Name of the JSON file naming the profiles
+            
+        Returns:
+            True if the horse exists
+        """
+        file_path = os.path.join(self.data_dir, filename)
+        with self._cache_lock:
+            index = self._load_index(file_path)
+            profile = index.get(horse_id)
+            if profile is None:
+                return False
+            # Copy on write: the current index (and its profiles) may still be
+            # read by other requests or rendered by a pending write
+            profile = dataclasses.replace(profile, training_history=list(profile.training_history))
+            profile.add_training_session(session)
+            updated = dict(index)
+            updated[horse_id] = profile
+            self._store_index(file_path, updated, [horse_id])
+            return True
+    
+    def flush(self) -> None:
+        """Write any batched profile saves to disk now."""
+        self._writer.flush()
     
     def create_sample_data(self) -> None:
         """
@@ -220,7 +620,8 @@ class DataLoader:
             )
         ]
         
-        horse_profiles[0].training_history.extend(thunder_sessions)
+        for session in thunder_sessions:
+            horse_profiles[0].add_training_session(session)
         
         # Sample training data
         training_data = [
@@ -288,10 +689,16 @@ class DataLoader:
         
         # Save the sample data
         self.save_horse_profiles(horse_profiles)
+        self.flush()
+        
+        # Also keep a JSON copy for readers that predate the msgpack format
+        profiles_path = os.path.join(self.data_dir, "horse_profiles.json")
+        with open(profiles_path, 'wb') as f:
+            f.write(orjson.dumps([profile.to_encodable() for profile in horse_profiles], option=self._json_option))
         
         # Save training data
         training_data_path = os.path.join(self.data_dir, "training_data.json")
-        with open(training_data_path, 'w') as f:
-            json.dump(training_data, f, indent=2)
+        with open(training_data_path, 'wb') as f:
+            f.write(orjson.dumps(training_data, option=self._json_option))
         
         logger.info(f"Created sample data in {self.data_dir}")
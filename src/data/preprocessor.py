@@ -5,11 +5,14 @@ This module contains utilities for preprocessing and transforming data
 for the Horse Trainer AI application.
 """
 import logging
+from datetime import date
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from scipy.sparse import csc_matrix
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.impute import SimpleImputer
 
 from src.models.horse_profile import HorseProfile
@@ -24,12 +27,37 @@ class DataPreprocessor:
     data for model training and prediction.
     """
     
+    # Per-horse features taken directly from the profile
+    BASIC_FEATURES = [
+        'horse_id', 'age', 'height_hands', 'weight_kg', 'breed', 'sex', 'color',
+        'has_medical_conditions', 'has_dietary_restrictions', 'has_lineage_info'
+    ]
+    # Activities and intensities summarized from the training history
+    ACTIVITIES = ['trot', 'canter', 'gallop', 'jump', 'dressage', 'trail', 'groundwork']
+    INTENSITIES = ['low', 'medium', 'high']
+    # Column index of each activity and intensity in the summary arrays
+    ACTIVITY_INDEX = {activity: i for i, activity in enumerate(ACTIVITIES)}
+    INTENSITY_INDEX = {intensity: i for i, intensity in enumerate(INTENSITIES)}
+    # Names of the summary features
+    AVG_PERF_FEATURES = [f'avg_perf_{activity}' for activity in ACTIVITIES]
+    INTENSITY_FEATURES = [f'pct_{intensity}_intensity' for intensity in INTENSITIES]
+    
     def __init__(self):
         """Initialize the data preprocessor."""
-        self.numerical_scaler = StandardScaler()
-        self.categorical_encoder = OneHotEncoder(handle_unknown='ignore')
-        self.imputer = SimpleImputer(strategy='mean')
-        self.fitted = False
+        # Impute then scale numerical columns in one pass. The scaler works in
+        # place on the imputer's output, which is already a fresh array.
+        self.imputer = SimpleImputer(strategy='mean', keep_empty_features=True)
+        self.numerical_scaler = StandardScaler(copy=False)
+        self.num_pipeline = Pipeline([
+            ('imp', self.imputer),
+            ('scale', self.numerical_scaler)
+        ])
+        # Category -> indicator index for each categorical column, in sorted order
+        self._cat_maps: Dict[str, Dict[str, int]] = {}
+        # (numerical, categorical) column split seen at fit time
+        self._column_split: Optional[Tuple[pd.Index, pd.Index]] = None
+        self._num_fitted = False
+        self._cat_fitted = False
     
     def preprocess_horse_data(self, 
                              horse_profiles: List[HorseProfile], 
@@ -44,67 +72,70 @@ class DataPreprocessor:
         Returns:
             Preprocessed DataFrame
         """
-        # Extract features
-        features = []
+        # Basic features (as of one date for the whole batch), built column by
+        # column so each column is allocated once instead of transposing rows.
+        # String columns are Series so an empty batch still gets them as text;
+        # numerical columns are float32, ample precision for ages, sizes and flags.
+        today = date.today()
+        n = len(horse_profiles)
+        features = pd.DataFrame({
+            'horse_id': pd.Series([horse.id for horse in horse_profiles]),
+            'age': np.fromiter((horse.age_on(today) for horse in horse_profiles), dtype=np.float32, count=n),
+            'height_hands': np.fromiter((horse.height_hands for horse in horse_profiles), dtype=np.float32, count=n),
+            'weight_kg': np.fromiter((horse.weight_kg for horse in horse_profiles), dtype=np.float32, count=n),
+            'breed': pd.Series([horse.breed for horse in horse_profiles]),
+            'sex': pd.Series([horse.sex for horse in horse_profiles]),
+            'color': pd.Series([horse.color for horse in horse_profiles]),
+            'has_medical_conditions': np.fromiter(
+                (horse.has_medical_conditions_on(today) for horse in horse_profiles), dtype=np.float32, count=n),
+            'has_dietary_restrictions': np.fromiter(
+                (len(horse.dietary_restrictions) > 0 for horse in horse_profiles), dtype=np.float32, count=n),
+            'has_lineage_info': np.fromiter(
+                (len(horse.lineage) > 0 for horse in horse_profiles), dtype=np.float32, count=n)
+        }, columns=self.BASIC_FEATURES)
         
-        for horse in horse_profiles:
-            # Basic features
-            horse_features = {
-                'horse_id': horse.id,
-                'age': horse.age,
-                'height_hands': horse.height_hands,
-                'weight_kg': horse.weight_kg,
-                'breed': horse.breed,
-                'sex': horse.sex,
-                'color': horse.color,
-                'has_medical_conditions': int(horse.has_medical_conditions),
-                'has_dietary_restrictions': int(len(horse.dietary_restrictions) > 0),
-                'has_lineage_info': int(len(horse.lineage) > 0)
-            }
-            
-            # Training statistics
-            if horse.training_history:
-                # Average performance by activity type
-                perf_by_activity = {}
-                for session in horse.training_history:
-                    activity = session.activity_type
-                    if activity not in perf_by_activity:
-                        perf_by_activity[activity] = []
-                    perf_by_activity[activity].append(session.performance_rating)
-                
-                # Add average performance for common activities
-                for activity in ['trot', 'canter', 'gallop', 'jump', 'dressage', 'trail', 'groundwork']:
-                    if activity in perf_by_activity:
-                        horse_features[f'avg_perf_{activity}'] = np.mean(perf_by_activity[activity])
-                    else:
-                        horse_features[f'avg_perf_{activity}'] = np.nan
-                
-                # Intensity preferences
-                intensity_counts = {'low': 0, 'medium': 0, 'high': 0}
-                for session in horse.training_history:
-                    intensity_counts[session.intensity] += 1
-                total = sum(intensity_counts.values())
-                if total > 0:
-                    horse_features['pct_low_intensity'] = intensity_counts['low'] / total * 100
-                    horse_features['pct_medium_intensity'] = intensity_counts['medium'] / total * 100
-                    horse_features['pct_high_intensity'] = intensity_counts['high'] / total * 100
-                else:
-                    horse_features['pct_low_intensity'] = np.nan
-                    horse_features['pct_medium_intensity'] = np.nan
-                    horse_features['pct_high_intensity'] = np.nan
-            else:
-                # Set default values if no training history
-                for activity in ['trot', 'canter', 'gallop', 'jump', 'dressage', 'trail', 'groundwork']:
-                    horse_features[f'avg_perf_{activity}'] = np.nan
-                
-                horse_features['pct_low_intensity'] = np.nan
-                horse_features['pct_medium_intensity'] = np.nan
-                horse_features['pct_high_intensity'] = np.nan
+        # Flatten every training session into per-session arrays: the horse's
+        # row, the activity and intensity indices (-1 if not summarized) and
+        # the rating. The statistics below are then a few bincount passes.
+        history = [session for horse in horse_profiles for session in horse.training_history]
+        n_sessions = len(history)
+        session_counts = np.fromiter((len(horse.training_history) for horse in horse_profiles), dtype=np.intp, count=n)
+        horse_idx = np.repeat(np.arange(n), session_counts)
+        activity_code, intensity_code = self.ACTIVITY_INDEX.get, self.INTENSITY_INDEX.get
+        activity_idx = np.fromiter(
+            (activity_code(session.activity_type, -1) for session in history), dtype=np.intp, count=n_sessions)
+        intensity_idx = np.fromiter(
+            (intensity_code(session.intensity, -1) for session in history), dtype=np.intp, count=n_sessions)
+        ratings = np.fromiter((session.performance_rating for session in history), dtype=np.float64, count=n_sessions)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Average performance for common activities (NaN if never done)
+            n_activities = len(self.ACTIVITIES)
+            known = activity_idx >= 0
+            cells = horse_idx[known] * n_activities + activity_idx[known]
+            rating_sums = np.bincount(cells, weights=ratings[known], minlength=n * n_activities)
+            activity_counts = np.bincount(cells, minlength=n * n_activities)
+            avg_perf = (rating_sums / activity_counts).reshape(n, n_activities)
             
-            features.append(horse_features)
+            # Intensity preferences as percentages of each horse's sessions
+            # (NaN for horses without training history)
+            n_intensities = len(self.INTENSITIES)
+            known = intensity_idx >= 0
+            cells = horse_idx[known] * n_intensities + intensity_idx[known]
+            intensity_counts = np.bincount(cells, minlength=n * n_intensities).reshape(n, n_intensities)
+            pct_intensity = intensity_counts / session_counts[:, None] * 100
         
-        # Convert to DataFrame
-        df = pd.DataFrame(features)
+        df = pd.concat([
+            features,
+            pd.DataFrame(
+                avg_perf.astype(np.float32),
+                columns=self.AVG_PERF_FEATURES
+            ),
+            pd.DataFrame(
+                pct_intensity.astype(np.float32),
+                columns=self.INTENSITY_FEATURES
+            )
+        ], axis=1)
         
         # Handle missing values and preprocessing
         return self._preprocess_dataframe(df, fit)
@@ -125,14 +156,21 @@ class DataPreprocessor:
         # Convert to DataFrame
         df = pd.DataFrame(training_data)
         
-        # Convert date strings to datetime
+        # Convert date strings to datetime (training dates repeat, so cache
+        # the parsed values)
         if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
+            days = pd.to_datetime(df['date'], cache=True).to_numpy().astype('datetime64[D]')
             
-            # Extract date-related features
-            df['month'] = df['date'].dt.month
-            df['year'] = df['date'].dt.year
-            df['day_of_week'] = df['date'].dt.dayofweek
+            # Extract date-related features with datetime64 arithmetic rather
+            # than one .dt accessor pass per feature
+            years = days.astype('datetime64[Y]')
+            features = np.stack([
+                (days.astype('datetime64[M]') - years).astype(np.int64) + 1,  # month
+                years.astype(np.int64) + 1970,  # year
+                (days.astype(np.int64) + 3) % 7  # day of week (1970-01-01 was a Thursday)
+            ], axis=1).astype(np.float64)
+            features[np.isnat(days)] = np.nan
+            df[['month', 'year', 'day_of_week']] = features
             
             # Drop original date column
             df = df.drop('date', axis=1)
@@ -144,66 +182,68 @@ class DataPreprocessor:
         """
         Preprocess a DataFrame with necessary transformations.
         
+        The input frame is consumed: its columns are transformed in place
+        rather than on a copy, so callers must not reuse it.
+        
         Args:
-            df: Input DataFrame
+            df: Input DataFrame (modified)
             fit: Whether to fit the preprocessors on this data
             
         Returns:
             Preprocessed DataFrame
         """
-        # Make a copy to avoid modifying the original
-        df_processed = df.copy()
+        df_processed = df
         
-        # Store ID column if present
+        # Set the ID column aside if present
         id_col = None
         if 'horse_id' in df_processed.columns:
-            id_col = df_processed['horse_id'].copy()
-            df_processed = df_processed.drop('horse_id', axis=1)
+            id_col = df_processed.pop('horse_id')
         
-        # Split numerical and categorical columns
-        numerical_cols = df_processed.select_dtypes(include=['number']).columns
-        categorical_cols = df_processed.select_dtypes(include=['object']).columns
-        
-        # Handle missing values
-        if len(numerical_cols) > 0:
-            # Impute missing numerical values
-            if fit or not self.fitted:
-                self.imputer.fit(df_processed[numerical_cols])
-                self.fitted = True
-            
-            df_processed[numerical_cols] = self.imputer.transform(df_processed[numerical_cols])
-        
-        # Scale numerical features if there are any
-        if len(numerical_cols) > 0:
-            if fit or not self.fitted:
-                self.numerical_scaler.fit(df_processed[numerical_cols])
-            
-            # Transform and create a new DataFrame
-            scaled_numerical = pd.DataFrame(
-                self.numerical_scaler.transform(df_processed[numerical_cols]),
-                columns=numerical_cols,
-                index=df_processed.index
+        # Split numerical and categorical columns by dtype when fitting, and
+        # reuse that split afterwards instead of rescanning every dtype
+        if fit or self._column_split is None:
+            self._column_split = (
+                df_processed.select_dtypes(include=['number']).columns,
+                df_processed.select_dtypes(include=['object']).columns
             )
-            
-            # Replace original numerical columns with scaled values
-            for col in numerical_cols:
-                df_processed[col] = scaled_numerical[col]
+        numerical_cols, categorical_cols = self._column_split
+        missing = numerical_cols.union(categorical_cols).difference(df_processed.columns)
+        if len(missing) > 0:
+            raise ValueError(f"Missing columns seen at fit time: {list(missing)}")
+        
+        # Impute missing values and scale numerical features if there are any.
+        # The output is float32 whatever the input width: halving the columns
+        # halves the memory traffic here and in the models downstream. An empty
+        # batch has nothing to scale (sklearn rejects zero-sample input).
+        if len(numerical_cols) > 0 and len(df_processed) > 0:
+            if fit or not self._num_fitted:
+                scaled = self.num_pipeline.fit_transform(df_processed[numerical_cols])
+                self._num_fitted = True
+            else:
+                scaled = self.num_pipeline.transform(df_processed[numerical_cols])
+            df_processed[numerical_cols] = scaled.astype(np.float32, copy=False)
         
         # Encode categorical features if there are any
         if len(categorical_cols) > 0:
-            if fit or not self.fitted:
-                self.categorical_encoder.fit(df_processed[categorical_cols])
-            
-            # Get feature names
-            feature_names = self.categorical_encoder.get_feature_names_out(categorical_cols)
+            if fit or not self._cat_fitted:
+                self._cat_maps = {
+                    col: {value: i for i, value in enumerate(sorted(df_processed[col].dropna().unique()))}
+                    for col in categorical_cols
+                }
+                self._cat_fitted = True
             
-            # Transform categorical columns
-            cat_encoded = self.categorical_encoder.transform(df_processed[categorical_cols])
+            # Transform categorical columns (a sparse matrix: one nonzero per column)
+            cat_encoded, feature_names = self._one_hot(df_processed, categorical_cols)
             
-            # Convert to DataFrame
+            # Convert to DataFrame with sparse columns, never materializing the
+            # mostly-zero dense matrix. Columns are built one at a time because
+            # DataFrame.sparse.from_spmatrix uses NaN rather than 0 as the fill
+            # value on some pandas versions.
             cat_encoded_df = pd.DataFrame(
-                cat_encoded.toarray(),
-                columns=feature_names,
+                {
+                    name: pd.arrays.SparseArray.from_spmatrix(cat_encoded[:, [i]])
+                    for i, name in enumerate(feature_names)
+                },
                 index=df_processed.index
             )
             
@@ -219,6 +259,37 @@ class DataPreprocessor:
         
         return df_processed
     
+    def _one_hot(self, df: pd.DataFrame, categorical_cols: pd.Index) -> Tuple[csc_matrix, List[str]]:
+        """
+        One-hot encode categorical columns with the fitted category maps.
+        
+        Each value is mapped to its indicator column in one vectorized lookup
+        and the indicators are written straight into a sparse matrix. Unknown
+        or missing values get no indicator (an all-zero row for that column).
+        
+        Args:
+            df: Input DataFrame
+            categorical_cols: Columns to encode
+            
+        Returns:
+            Tuple of (sparse indicator matrix, feature names as "<column>_<value>")
+        """
+        rows, cols, feature_names = [], [], []
+        for col in categorical_cols:
+            categories = self._cat_maps[col]
+            idx = df[col].map(categories).to_numpy(dtype=float)
+            known = ~np.isnan(idx)
+            rows.append(np.flatnonzero(known))
+            cols.append(len(feature_names) + idx[known].astype(np.intp))
+            feature_names.extend(f"{col}_{value}" for value in categories)
+        
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        encoded = csc_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(df), len(feature_names))
+        )
+        return encoded, feature_names
+    
     def preprocess_for_training(self, 
                                horse_profiles: List[HorseProfile], 
                                training_data: List[Dict]) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -232,20 +303,21 @@ class DataPreprocessor:
         Returns:
             Tuple of (features DataFrame, target DataFrame)
         """
-        # Preprocess horse profiles
-        horse_df = self.preprocess_horse_data(horse_profiles, fit=True)
+        # Preprocess horse profiles, indexed by ID for the join below
+        horse_df = self.preprocess_horse_data(horse_profiles, fit=True).set_index('horse_id')
         
         # Preprocess training data
         training_df = self.preprocess_training_data(training_data, fit=True)
         
-        # Merge data on horse_id
-        merged_df = pd.merge(
-            training_df, 
-            horse_df, 
-            on='horse_id', 
+        # Look each training row's horse up in the index directly instead of
+        # building a hash join over both key columns
+        merged_df = training_df.join(
+            horse_df,
+            on='horse_id',
             how='inner',
-            suffixes=('_training', '_horse')
-        )
+            lsuffix='_training',
+            rsuffix='_horse'
+        ).reset_index(drop=True)
         
         # Extract target variables
         target_columns = ['activity_type', 'success_rating', 'improvement_score']
@@ -52,12 +52,19 @@ def main():
         
         # Initialize model
         model = TrainingModel(config=config)
+        output_dir = config.get('output_dir', 'output')
+        model_file = os.path.join(output_dir, 'model.joblib')
         
-        # Train model if needed
+        # Train model if needed (and keep it for later runs), otherwise reuse
+        # the last trained one
         if config.get('train_model', True):
             logger.info("Training model...")
             model.train(training_data, horse_profiles)
             logger.info("Model training complete")
+            os.makedirs(output_dir, exist_ok=True)
+            model.save_model(model_file)
+        elif os.path.exists(model_file):
+            model.load_model(model_file)
         
         # Run predictions or recommendations
         if config.get('generate_recommendations', True):
@@ -65,7 +72,6 @@ def main():
             logger.info(f"Generated {len(recommendations)} training recommendations")
             
             # Save recommendations
-            output_dir = config.get('output_dir', 'output')
             os.makedirs(output_dir, exist_ok=True)
             output_file = os.path.join(output_dir, 'recommendations.json')
             model.save_recommendations(recommendations, output_file)
@@ -4,11 +4,19 @@ Horse Profile Model
 This module contains the HorseProfile class which represents 
 a horse's characteristics and training history.
 """
+import sys
 from dataclasses import dataclass, field
 from datetime import date
+from operator import attrgetter
 from typing import Dict, List, Optional
 
-@dataclass
+import orjson
+
+# Slotted instances drop the per-instance __dict__, which adds up over
+# thousands of sessions; dataclass(slots=True) needs Python 3.10
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class MedicalRecord:
     """Medical record for a horse."""
     date: date
@@ -16,7 +24,7 @@ class MedicalRecord:
     treatment: str
     notes: Optional[str] = None
 
-@dataclass
+@dataclass(**_SLOTS)
 class TrainingSession:
     """Training session record."""
     date: date
@@ -26,7 +34,7 @@ class TrainingSession:
     performance_rating: int  # 1-10
     notes: Optional[str] = None
 
-@dataclass
+@dataclass(**_SLOTS)
 class HorseProfile:
     """Horse profile containing all relevant information."""
     id: str
@@ -40,34 +48,94 @@ class HorseProfile:
     lineage: Dict[str, str] = field(default_factory=dict)
     dietary_restrictions: List[str] = field(default_factory=list)
     medical_history: List[MedicalRecord] = field(default_factory=list)
+    # Kept sorted by date; add sessions with add_training_session
     training_history: List[TrainingSession] = field(default_factory=list)
     
+    def __post_init__(self):
+        self.training_history.sort(key=attrgetter('date'))
+    
+    def add_training_session(self, session: TrainingSession) -> None:
+        """Add a training session, keeping the history sorted by date."""
+        # Insert after any sessions on the same day, like an append would
+        index = self._first_session_after(session.date, inclusive=False)
+        self.training_history.insert(index, session)
+    
+    def _first_session_after(self, day: date, inclusive: bool = True) -> int:
+        """
+        Binary search the sorted history for the first session on (if
+        inclusive) or after `day`.
+        """
+        history = self.training_history
+        lo, hi = 0, len(history)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if history[mid].date < day or (not inclusive and history[mid].date == day):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
     @property
     def age(self) -> float:
         """Calculate the horse's age in years."""
-        today = date.today()
+        return self.age_on(date.today())
+    
+    def age_on(self, day: date) -> int:
+        """Calculate the horse's age in whole years on the given day."""
         born = self.birth_date
-        age = today.year - born.year - ((today.month, today.day) < (born.month, born.day))
-        return age
+        return day.year - born.year - ((day.month, day.day) < (born.month, born.day))
     
     @property
     def recent_training(self) -> List[TrainingSession]:
         """Get the last 30 days of training sessions."""
-        today = date.today()
-        thirty_days_ago = date.fromordinal(today.toordinal() - 30)
-        return [session for session in self.training_history 
-                if session.date >= thirty_days_ago]
+        return self.recent_training_on(date.today())
+    
+    def recent_training_on(self, day: date) -> List[TrainingSession]:
+        """Get the training sessions in the 30 days up to the given day."""
+        thirty_days_ago = date.fromordinal(day.toordinal() - 30)
+        return self.training_history[self._first_session_after(thirty_days_ago):]
     
     @property
     def has_medical_conditions(self) -> bool:
         """Check if the horse has any active medical conditions."""
+        return self.has_medical_conditions_on(date.today())
+    
+    def has_medical_conditions_on(self, day: date) -> bool:
+        """Check if the horse had any active medical conditions on the given day."""
         # This is a simplification - in reality, we'd need more complex logic
         # to determine if conditions are still active
         if not self.medical_history:
             return False
-        recent_date = date.fromordinal(date.today().toordinal() - 90)  # Last 90 days
+        recent_date = date.fromordinal(day.toordinal() - 90)  # Last 90 days
         return any(record.date >= recent_date for record in self.medical_history)
     
+    def to_encodable(self) -> Dict:
+        """
+        Convert the horse profile to a dictionary for orjson or msgspec.
+        
+        Same keys as to_dict, but the records are left as dataclasses and the
+        dates as date objects, since both encoders serialize those natively.
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'breed': self.breed,
+            'birth_date': self.birth_date,
+            'age': self.age,
+            'sex': self.sex,
+            'color': self.color,
+            'height_hands': self.height_hands,
+            'weight_kg': self.weight_kg,
+            'lineage': self.lineage,
+            'dietary_restrictions': self.dietary_restrictions,
+            'medical_history': self.medical_history,
+            'training_history': self.training_history
+        }
+    
+    def to_json(self, option: int = 0) -> bytes:
+        """Serialize the horse profile to JSON bytes (`option` is passed to orjson)."""
+        return orjson.dumps(self.to_encodable(), option=option)
+    
     def to_dict(self) -> Dict:
         """Convert the horse profile to a dictionary."""
         return {
@@ -107,43 +175,41 @@ class HorseProfile:
     @classmethod
     def from_dict(cls, data: Dict) -> 'HorseProfile':
         """Create a HorseProfile from a dictionary."""
-        # Convert date strings to date objects
-        birth_date = date.fromisoformat(data['birth_date'])
+        # Local aliases keep the per-record loops free of global lookups
+        parse_date = date.fromisoformat
+        record_type = MedicalRecord
+        session_type = TrainingSession
         
-        # Create a new HorseProfile
-        profile = cls(
+        return cls(
             id=data['id'],
             name=data['name'],
             breed=data['breed'],
-            birth_date=birth_date,
+            birth_date=parse_date(data['birth_date']),
             sex=data['sex'],
             color=data['color'],
             height_hands=data['height_hands'],
             weight_kg=data['weight_kg'],
             lineage=data.get('lineage', {}),
-            dietary_restrictions=data.get('dietary_restrictions', [])
+            dietary_restrictions=data.get('dietary_restrictions', []),
+            medical_history=[
+                record_type(
+                    parse_date(record['date']),
+                    record['condition'],
+                    record['treatment'],
+                    record.get('notes')
+                )
+                for record in data.get('medical_history', ())
+            ],
+            # Sorted by date in __post_init__
+            training_history=[
+                session_type(
+                    parse_date(session['date']),
+                    session['activity_type'],
+                    session['duration_minutes'],
+                    session['intensity'],
+                    session['performance_rating'],
+                    session.get('notes')
+                )
+                for session in data.get('training_history', ())
+            ]
         )
-        
-        # Add medical history
-        if 'medical_history' in data:
-            for record in data['medical_history']:
-                profile.medical_history.append(MedicalRecord(
-                    date=date.fromisoformat(record['date']),
-                    condition=record['condition'],
-                    treatment=record['treatment'],
-                    notes=record.get('notes')
-                ))
-        
-        # Add training history
-        if 'training_history' in data:
-            for session in data['training_history']:
-                profile.training_history.append(TrainingSession(
-                    date=date.fromisoformat(session['date']),
-                    activity_type=session['activity_type'],
-                    duration_minutes=session['duration_minutes'],
-                    intensity=session['intensity'],
-                    performance_rating=session['performance_rating'],
-                    notes=session.get('notes')
-                ))
-        
-        return profile
@@ -6,15 +6,17 @@ and generates personalized training recommendations.
 """
 import json
 import logging
-import pickle
 from datetime import date, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
-from sklearn.model_selection import train_test_split, cross_val_score
+import joblib
+from joblib import Parallel, delayed
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingRegressor
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
@@ -31,6 +33,27 @@ class TrainingModel:
     extraction to model training and generation of recommendations.
     """
     
+    # Training intensities counted per horse, in feature column order
+    INTENSITIES = ['low', 'medium', 'high']
+    INTENSITY_INDEX = {intensity: i for i, intensity in enumerate(INTENSITIES)}
+    # Base session length (minutes) and intensity of each activity
+    BASE_DURATIONS = {
+        'trot': 30,
+        'canter': 20,
+        'gallop': 15,
+        'jump': 25,
+        'dressage': 40,
+        'trail': 45,
+        'groundwork': 35
+    }
+    DEFAULT_DURATION = 30
+    BASE_INTENSITIES = {
+        'gallop': 'high', 'jump': 'high',
+        'canter': 'medium', 'dressage': 'medium', 'trail': 'medium',
+        'trot': 'low', 'groundwork': 'low'
+    }
+    DEFAULT_INTENSITY = 'low'
+    
     def __init__(self, config: Dict):
         """
         Initialize the training model with the given configuration.
@@ -44,88 +67,139 @@ class TrainingModel:
         self.features_config = config.get('features', {})
         self.recommendations_config = config.get('recommendations', {})
         
+        # Settings read on every feature extraction / recommendation run
+        self.include_medical = self.features_config.get('include_medical', True)
+        self.include_diet = self.features_config.get('include_diet', True)
+        self.include_lineage = self.features_config.get('include_lineage', True)
+        self.max_per_horse = self.recommendations_config.get('max_per_horse', 5)
+        self.min_confidence = self.recommendations_config.get('min_confidence', 0.1)
+        
         self.model = None
         self.feature_pipeline = None
         self.performance_predictor = None
+        
+        # Features of the last batch: (date, profiles, their history lengths)
+        # and the extracted frame
+        self._features_memo: Optional[Tuple[Tuple, pd.DataFrame]] = None
     
     def _extract_features(self, horse_profiles: List[HorseProfile]) -> pd.DataFrame:
         """
         Extract features from horse profiles for model training.
         
+        The result for the last batch is kept, so training and then scoring
+        the same profiles on the same day extracts the features once. A batch
+        matches if it holds the same profile objects with the same number of
+        training and medical records (profiles are replaced, or have records
+        appended, when they change). Callers must not modify the frame.
+        
         Args:
             horse_profiles: List of HorseProfile objects
             
         Returns:
             DataFrame with extracted features
         """
-        features = []
-        
-        for horse in horse_profiles:
-            # Basic features
-            horse_features = {
-                'horse_id': horse.id,
-                'age': horse.age,
-                'height_hands': horse.height_hands,
-                'weight_kg': horse.weight_kg,
-                'breed': horse.breed,
-                'sex': horse.sex,
-            }
-            
-            # Add recent training statistics
-            recent_training = horse.recent_training
-            if recent_training:
-                avg_duration = np.mean([s.duration_minutes for s in recent_training])
-                avg_performance = np.mean([s.performance_rating for s in recent_training])
-                training_types = set(s.activity_type for s in recent_training)
-                intensity_counts = {
-                    'low': sum(1 for s in recent_training if s.intensity == 'low'),
-                    'medium': sum(1 for s in recent_training if s.intensity == 'medium'),
-                    'high': sum(1 for s in recent_training if s.intensity == 'high')
-                }
-                
-                horse_features.update({
-                    'recent_training_count': len(recent_training),
-                    'avg_training_duration': avg_duration,
-                    'avg_performance_rating': avg_performance,
-                    'training_variety': len(training_types),
-                    'low_intensity_count': intensity_counts['low'],
-                    'medium_intensity_count': intensity_counts['medium'],
-                    'high_intensity_count': intensity_counts['high'],
-                })
-            else:
-                # Default values if no recent training
-                horse_features.update({
-                    'recent_training_count': 0,
-                    'avg_training_duration': 0,
-                    'avg_performance_rating': 0,
-                    'training_variety': 0,
-                    'low_intensity_count': 0,
-                    'medium_intensity_count': 0,
-                    'high_intensity_count': 0,
-                })
-            
-            # Add medical condition flag if enabled
-            if self.features_config.get('include_medical', True):
-                horse_features['has_medical_conditions'] = int(horse.has_medical_conditions)
-            
-            # Add dietary restrictions if enabled
-            if self.features_config.get('include_diet', True):
-                horse_features['has_dietary_restrictions'] = int(len(horse.dietary_restrictions) > 0)
-            
-            # Add lineage information if enabled
-            if self.features_config.get('include_lineage', True) and horse.lineage:
-                horse_features['has_lineage_info'] = int(len(horse.lineage) > 0)
-            
-            features.append(horse_features)
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(features)
-        
-        # Handle missing values
-        df = df.fillna(0)
+        # All statistics are taken as of one date for the whole batch
+        today = date.today()
+        key = (
+            today,
+            tuple(horse_profiles),
+            tuple((len(horse.training_history), len(horse.medical_history)) for horse in horse_profiles)
+        )
+        memo = self._features_memo
+        if memo is not None and self._same_batch(memo[0], key):
+            return memo[1]
         
+        df = self._build_features(horse_profiles, today)
+        self._features_memo = (key, df)
         return df
     
+    @staticmethod
+    def _same_batch(a: Tuple, b: Tuple) -> bool:
+        """Compare two _extract_features keys, matching profiles by identity."""
+        return (
+            a[0] == b[0]
+            and len(a[1]) == len(b[1])
+            and all(x is y for x, y in zip(a[1], b[1]))
+            and a[2] == b[2]
+        )
+    
+    def _build_features(self, horse_profiles: List[HorseProfile], today: date) -> pd.DataFrame:
+        """Build the feature frame for the profiles as of the given day."""
+        n = len(horse_profiles)
+        
+        # Flatten the recent sessions of every horse into parallel arrays (the
+        # horse's row, duration, rating, activity and intensity codes), so the
+        # per-horse statistics below are bincount passes instead of Python loops
+        recent = [horse.recent_training_on(today) for horse in horse_profiles]
+        sessions = [session for horse_sessions in recent for session in horse_sessions]
+        n_sessions = len(sessions)
+        counts = np.fromiter((len(horse_sessions) for horse_sessions in recent), dtype=np.int64, count=n)
+        horse_idx = np.repeat(np.arange(n), counts)
+        durations = np.fromiter((s.duration_minutes for s in sessions), dtype=np.float32, count=n_sessions)
+        ratings = np.fromiter((s.performance_rating for s in sessions), dtype=np.float32, count=n_sessions)
+        activity_codes: Dict[str, int] = {}
+        activity_idx = np.fromiter(
+            (activity_codes.setdefault(s.activity_type, len(activity_codes)) for s in sessions),
+            dtype=np.int64, count=n_sessions)
+        intensity_code = self.INTENSITY_INDEX.get
+        intensity_idx = np.fromiter(
+            (intensity_code(s.intensity, -1) for s in sessions), dtype=np.int64, count=n_sessions)
+        
+        # Averages are 0 for horses without recent training
+        sessions_or_one = np.maximum(counts, 1).astype(np.float32)
+        
+        # Distinct (horse, activity) pairs give each horse's training variety
+        n_activities = max(len(activity_codes), 1)
+        pairs = np.unique(horse_idx * n_activities + activity_idx)
+        variety = np.bincount(pairs // n_activities, minlength=n)
+        
+        n_intensities = len(self.INTENSITIES)
+        known = intensity_idx >= 0
+        intensity_counts = np.bincount(
+            horse_idx[known] * n_intensities + intensity_idx[known], minlength=n * n_intensities
+        ).reshape(n, n_intensities)
+        
+        # Every column is built with its final dtype and holds no missing
+        # values (averages and counts are 0 without recent training); the few
+        # distinct breeds and sexes are stored once, as integer codes
+        columns = {
+            'horse_id': pd.Series([horse.id for horse in horse_profiles]),
+            'age': np.fromiter((horse.age_on(today) for horse in horse_profiles), dtype=np.int16, count=n),
+            'height_hands': np.nan_to_num(
+                np.array([horse.height_hands for horse in horse_profiles], dtype=np.float32), copy=False),
+            'weight_kg': np.nan_to_num(
+                np.array([horse.weight_kg for horse in horse_profiles], dtype=np.float32), copy=False),
+            'breed': pd.Categorical([horse.breed for horse in horse_profiles]),
+            'sex': pd.Categorical([horse.sex for horse in horse_profiles]),
+            'recent_training_count': counts.astype(np.int32),
+            'avg_training_duration': (
+                np.bincount(horse_idx, weights=durations, minlength=n).astype(np.float32) / sessions_or_one),
+            'avg_performance_rating': (
+                np.bincount(horse_idx, weights=ratings, minlength=n).astype(np.float32) / sessions_or_one),
+            'training_variety': variety.astype(np.int32)
+        }
+        for i, intensity in enumerate(self.INTENSITIES):
+            columns[f'{intensity}_intensity_count'] = intensity_counts[:, i].astype(np.int32)
+        
+        # Add medical condition flag if enabled
+        if self.include_medical:
+            columns['has_medical_conditions'] = np.fromiter(
+                (horse.has_medical_conditions_on(today) for horse in horse_profiles), dtype=np.int8, count=n)
+        
+        # Add dietary restrictions if enabled
+        if self.include_diet:
+            columns['has_dietary_restrictions'] = np.fromiter(
+                (len(horse.dietary_restrictions) > 0 for horse in horse_profiles), dtype=np.int8, count=n)
+        
+        # Add lineage information if enabled. The column is there even when no
+        # horse in the batch has lineage, so a batch predicted on always has
+        # the columns the pipeline was fitted on.
+        if self.include_lineage:
+            columns['has_lineage_info'] = np.fromiter(
+                (bool(horse.lineage) for horse in horse_profiles), dtype=np.int8, count=n)
+        
+        return pd.DataFrame(columns)
+    
     def _create_feature_pipeline(self, X: pd.DataFrame) -> ColumnTransformer:
         """
         Create a preprocessing pipeline for features.
@@ -137,29 +211,32 @@ class TrainingModel:
             Scikit-learn ColumnTransformer pipeline
         """
         # Identify categorical and numerical columns
-        categorical_cols = X.select_dtypes(include=['object']).columns.tolist()
+        categorical_cols = X.select_dtypes(include=['object', 'category']).columns.tolist()
         numerical_cols = X.select_dtypes(include=['number']).columns.tolist()
         
         # Remove 'horse_id' from numerical columns if present
         if 'horse_id' in numerical_cols:
             numerical_cols.remove('horse_id')
         
-        # Create preprocessing pipelines
+        # Create preprocessing pipelines. Both keep their output sparse-
+        # compatible (scaling without centering; trees only care about order)
+        # so the one-hot block never becomes a dense matrix.
         numerical_transformer = Pipeline(steps=[
-            ('scaler', StandardScaler())
+            ('scaler', StandardScaler(with_mean=False))
         ])
         
         categorical_transformer = Pipeline(steps=[
-            ('onehot', OneHotEncoder(handle_unknown='ignore'))
+            ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=True, dtype=np.float32))
         ])
         
-        # Combine preprocessing steps
+        # Combine preprocessing steps, always as a sparse matrix
         preprocessor = ColumnTransformer(
             transformers=[
                 ('num', numerical_transformer, numerical_cols),
                 ('cat', categorical_transformer, categorical_cols)
             ],
-            remainder='drop'  # Drop columns not specified
+            remainder='drop',  # Drop columns not specified
+            sparse_threshold=1.0
         )
         
         return preprocessor
@@ -198,17 +275,16 @@ class TrainingModel:
             horse_profiles: List of HorseProfile objects
         """
         logger.info("Extracting features from horse profiles")
-        X = self._extract_features(horse_profiles)
+        X = self._extract_features(horse_profiles).set_index('horse_id')
+        if not X.index.is_unique:
+            raise ValueError("Horse profiles contain duplicate horse IDs")
         
         logger.info("Preparing target variables")
-        y = self._prepare_target_variables(training_data)
-        
-        # Merge X and y on horse_id
-        merged_data = pd.merge(X, y, on='horse_id')
+        y = self._prepare_target_variables(training_data).set_index('horse_id')
         
-        # Remove horse_id column for modeling
-        horse_ids = merged_data['horse_id']
-        merged_data = merged_data.drop('horse_id', axis=1)
+        # Look each training record's horse up by ID (each record has exactly
+        # one horse), dropping horse_id for modeling
+        merged_data = y.join(X, how='inner').reset_index(drop=True)
         
         # Split target variables
         y_activity = merged_data['activity_type']
@@ -222,11 +298,18 @@ class TrainingModel:
         logger.info("Creating feature preprocessing pipeline")
         self.feature_pipeline = self._create_feature_pipeline(X)
         
-        # Split data for training and testing
+        # Split data for training and testing, keeping the share of each
+        # activity the same in both parts where there are enough records
         test_size = self.training_config.get('test_size', 0.2)
-        X_train, X_test, y_activity_train, y_activity_test = train_test_split(
-            X, y_activity, test_size=test_size, random_state=42
-        )
+        try:
+            X_train, X_test, y_activity_train, y_activity_test = train_test_split(
+                X, y_activity, test_size=test_size, random_state=42, stratify=y_activity
+            )
+        except ValueError as e:
+            logger.warning(f"Cannot stratify the split by activity ({str(e)}); splitting randomly")
+            X_train, X_test, y_activity_train, y_activity_test = train_test_split(
+                X, y_activity, test_size=test_size, random_state=42
+            )
         
         # Transform features
         X_train_transformed = self.feature_pipeline.fit_transform(X_train)
@@ -237,11 +320,45 @@ class TrainingModel:
         model_type = self.model_config.get('type', 'random_forest')
         
         if model_type == 'random_forest':
-            model_params = self.model_config.get('params', {})
+            # Build (and later predict with) the trees on all cores unless
+            # the config says otherwise
+            model_params = {'n_jobs': -1, **self.model_config.get('params', {})}
             self.model = RandomForestClassifier(**model_params)
             
-            # Train model
-            self.model.fit(X_train_transformed, y_activity_train)
+            # Performance predictor (histogram-based: features are binned
+            # once and splits are searched on all cores). The activity type
+            # is its last feature, handled natively as a categorical.
+            n_features = X_train_transformed.shape[1]
+            self.performance_predictor = HistGradientBoostingRegressor(
+                max_iter=100,
+                learning_rate=0.1,
+                max_depth=5,
+                min_samples_leaf=1,  # as GradientBoostingRegressor, which it replaced
+                categorical_features=[n_features],
+                random_state=42
+            )
+            
+            # Combine the transformed features (so the regressor sees the same
+            # scaled, encoded inputs as the forest) with the activity code for
+            # performance prediction. The regressor needs a dense matrix; trees
+            # work in float32 anyway.
+            activity_classes = np.unique(y_activity_train)  # the forest's classes_
+            activity_codes = np.searchsorted(activity_classes, y_activity_train.to_numpy())
+            if sparse.issparse(X_train_transformed):
+                X_train_dense = X_train_transformed.toarray()
+            else:
+                X_train_dense = np.asarray(X_train_transformed)
+            X_with_activity = np.column_stack([X_train_dense, activity_codes]).astype(np.float32, copy=False)
+            
+            y_success_train = y_success.loc[X_train.index]
+            
+            # The two models share no state, so train the regressor alongside
+            # the forest rather than after it
+            logger.info("Fitting activity and performance models")
+            Parallel(n_jobs=2, backend='threading')([
+                delayed(self.model.fit)(X_train_transformed, y_activity_train),
+                delayed(self.performance_predictor.fit)(X_with_activity, y_success_train)
+            ])
             
             # Evaluate model
             train_accuracy = self.model.score(X_train_transformed, y_activity_train)
@@ -250,24 +367,6 @@ class TrainingModel:
             logger.info(f"Activity model training accuracy: {train_accuracy:.4f}")
             logger.info(f"Activity model testing accuracy: {test_accuracy:.4f}")
             
-            # Train performance predictor
-            logger.info("Training performance prediction model")
-            self.performance_predictor = GradientBoostingRegressor(
-                n_estimators=100, 
-                learning_rate=0.1, 
-                max_depth=5, 
-                random_state=42
-            )
-            
-            # Combine X with activity type for performance prediction
-            X_with_activity = pd.concat([
-                X_train.reset_index(drop=True),
-                pd.get_dummies(y_activity_train, prefix='activity').reset_index(drop=True)
-            ], axis=1)
-            
-            y_success_train = y_success.loc[X_train.index]
-            self.performance_predictor.fit(X_with_activity, y_success_train)
-            
             # Evaluate performance predictor
             performance_score = self.performance_predictor.score(X_with_activity, y_success_train)
             logger.info(f"Performance predictor R² score: {performance_score:.4f}")
@@ -275,6 +374,42 @@ class TrainingModel:
         else:
             raise ValueError(f"Unsupported model type: {model_type}")
     
+    def save_model(self, file_path: str) -> None:
+        """
+        Save the fitted models and feature pipeline to a file.
+        
+        The file is written uncompressed so load_model can memory-map the
+        tree arrays instead of reading them into memory.
+        
+        Args:
+            file_path: Path to save the models to
+        """
+        if self.model is None or self.feature_pipeline is None:
+            raise ValueError("Model has not been trained yet")
+        
+        joblib.dump({
+            'model': self.model,
+            'feature_pipeline': self.feature_pipeline,
+            'performance_predictor': self.performance_predictor
+        }, file_path, compress=0)
+        logger.info(f"Saved model to {file_path}")
+    
+    def load_model(self, file_path: str) -> None:
+        """
+        Load models and feature pipeline saved with save_model.
+        
+        The arrays are memory-mapped read-only, so loading is fast and
+        processes serving the same file share its pages.
+        
+        Args:
+            file_path: Path to load the models from
+        """
+        saved = joblib.load(file_path, mmap_mode='r')
+        self.model = saved['model']
+        self.feature_pipeline = saved['feature_pipeline']
+        self.performance_predictor = saved['performance_predictor']
+        logger.info(f"Loaded model from {file_path}")
+    
     def generate_recommendations(self, 
                                horse_profiles: List[HorseProfile]) -> List[Dict]:
         """
@@ -289,8 +424,6 @@ class TrainingModel:
         if self.model is None or self.feature_pipeline is None:
             raise ValueError("Model has not been trained yet")
         
-        recommendations = []
-        
         # Extract features from profiles
         X = self._extract_features(horse_profiles)
         
@@ -310,105 +443,71 @@ class TrainingModel:
         # Get activity classes
         activity_classes = self.model.classes_
         
-        # Generate recommendations for each horse
-        for i, horse_id in enumerate(horse_ids):
-            horse = profile_map[horse_id]
-            
-            # Sort activities by probability
-            activity_scores = [(activity, prob) for activity, prob in 
-                              zip(activity_classes, activity_probs[i])]
-            activity_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            # Get top activities
-            max_recommendations = self.recommendations_config.get('max_per_horse', 5)
-            min_confidence = self.recommendations_config.get('min_confidence', 0.1)
-            
-            horse_recommendations = []
-            
-            for activity, confidence in activity_scores[:max_recommendations]:
-                if confidence >= min_confidence:
-                    # Create recommendation
-                    recommendation = {
-                        'horse_id': horse_id,
-                        'horse_name': horse.name,
-                        'activity_type': activity,
-                        'confidence': round(float(confidence), 3),
-                        'recommended_date': date.today().isoformat(),
-                        'recommended_duration': self._recommend_duration(horse, activity),
-                        'recommended_intensity': self._recommend_intensity(horse, activity),
-                        'notes': self._generate_recommendation_notes(horse, activity)
-                    }
-                    
-                    horse_recommendations.append(recommendation)
-            
-            recommendations.extend(horse_recommendations)
+        # Top activities of every horse by probability. A partition finds each
+        # row's k-th best probability; everything above it is kept, and ties
+        # at it are filled in class order (forest probabilities are fractions
+        # of trees, so ties are common). Only those k columns are then sorted.
+        n_horses, n_classes = activity_probs.shape
+        k = max(0, min(self.max_per_horse, n_classes))
+        if 0 < k < n_classes:
+            kth = -np.partition(-activity_probs, k - 1, axis=1)[:, [k - 1]]
+            above = activity_probs > kth
+            tied = activity_probs == kth
+            fill = k - above.sum(axis=1, keepdims=True)
+            selected = above | (tied & (np.cumsum(tied, axis=1) <= fill))
+            top_idx = np.nonzero(selected)[1].reshape(n_horses, k)
+        else:
+            top_idx = np.broadcast_to(np.arange(n_classes)[:k], (n_horses, k))
+        top_probs = np.take_along_axis(activity_probs, top_idx, axis=1)
+        order = np.lexsort((top_idx, -top_probs), axis=-1)
+        top_idx = np.take_along_axis(top_idx, order, axis=1)
+        top_probs = np.take_along_axis(top_probs, order, axis=1)
+        confident = top_probs >= self.min_confidence
+        
+        # Durations and intensities of every selected (horse, activity) pair,
+        # from per-class base values adjusted per horse: sessions are cut by
+        # 15 minutes under 3 years, 10 over 15 years and 10 more with medical
+        # conditions (at least 15, rounded to 5 minutes), and any of those
+        # lowers the intensity one level
+        today = date.today()
+        horses = [profile_map[horse_id] for horse_id in horse_ids]
+        ages = np.fromiter((horse.age_on(today) for horse in horses), dtype=np.int64, count=n_horses)
+        has_medical = np.fromiter(
+            (horse.has_medical_conditions_on(today) for horse in horses), dtype=bool, count=n_horses)
+        base_durations = np.array(
+            [self.BASE_DURATIONS.get(activity, self.DEFAULT_DURATION) for activity in activity_classes])
+        base_levels = np.array([
+            self.INTENSITY_INDEX[self.BASE_INTENSITIES.get(activity, self.DEFAULT_INTENSITY)]
+            for activity in activity_classes
+        ])
+        cut = np.where(ages < 3, 15, np.where(ages > 15, 10, 0)) + np.where(has_medical, 10, 0)
+        durations = np.maximum(15, base_durations[top_idx] - cut[:, None])
+        durations = (np.round(durations / 5) * 5).astype(np.int64).tolist()
+        lowered = (ages < 3) | (ages > 15) | has_medical
+        levels = np.maximum(base_levels[top_idx] - lowered[:, None], 0).tolist()
+        recommended_date = today.isoformat()
+        
+        # One recommendation per confident (horse, activity) pair, in horse
+        # order and by confidence within a horse, written into a list of the
+        # final size
+        rows, cols = np.nonzero(confident)
+        recommendations = [None] * len(rows)
+        for n, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+            horse = horses[i]
+            activity = activity_classes[top_idx[i, j]]
+            recommendations[n] = {
+                'horse_id': horse.id,
+                'horse_name': horse.name,
+                'activity_type': activity,
+                'confidence': round(float(top_probs[i, j]), 3),
+                'recommended_date': recommended_date,
+                'recommended_duration': durations[i][j],
+                'recommended_intensity': self.INTENSITIES[levels[i][j]],
+                'notes': self._generate_recommendation_notes(horse, activity)
+            }
         
         return recommendations
     
-    def _recommend_duration(self, horse: HorseProfile, activity: str) -> int:
-        """Recommend training duration based on horse profile and activity."""
-        # Base duration by activity type
-        base_durations = {
-            'trot': 30,
-            'canter': 20,
-            'gallop': 15,
-            'jump': 25,
-            'dressage': 40,
-            'trail': 45,
-            'groundwork': 35
-        }
-        
-        # Get base duration, default to 30 minutes
-        duration = base_durations.get(activity, 30)
-        
-        # Adjust for age - younger and older horses get shorter sessions
-        if horse.age < 3:
-            duration = max(15, duration - 15)  # Minimum 15 minutes
-        elif horse.age > 15:
-            duration = max(15, duration - 10)  # Minimum 15 minutes
-        
-        # Adjust for medical conditions
-        if horse.has_medical_conditions:
-            duration = max(15, duration - 10)  # Minimum 15 minutes
-        
-        # Round to nearest 5 minutes
-        return round(duration / 5) * 5
-    
-    def _recommend_intensity(self, horse: HorseProfile, activity: str) -> str:
-        """Recommend training intensity based on horse profile and activity."""
-        # High-intensity activities
-        high_intensity = ['gallop', 'jump']
-        # Medium-intensity activities
-        medium_intensity = ['canter', 'dressage', 'trail']
-        # Low-intensity activities
-        low_intensity = ['trot', 'groundwork']
-        
-        # Base intensity by activity type
-        if activity in high_intensity:
-            base_intensity = 'high'
-        elif activity in medium_intensity:
-            base_intensity = 'medium'
-        else:
-            base_intensity = 'low'
-        
-        # Adjust for age
-        if horse.age < 3 or horse.age > 15:
-            # Lower intensity for very young or older horses
-            if base_intensity == 'high':
-                return 'medium'
-            elif base_intensity == 'medium':
-                return 'low'
-        
-        # Adjust for medical conditions
-        if horse.has_medical_conditions:
-            # Lower intensity for horses with medical conditions
-            if base_intensity == 'high':
-                return 'medium'
-            elif base_intensity == 'medium':
-                return 'low'
-        
-        return base_intensity
-    
     def _generate_recommendation_notes(self, horse: HorseProfile, activity: str) -> str:
         """Generate personalized notes for the recommendation."""
         notes = []
@@ -0,0 +1,327 @@
+"""
+Caching utilities for Horse Trainer AI
+
+This module provides a two-tier cache for LLM answers: hot entries are kept in
+an in-memory LRU and every entry is persisted to an append-only JSON-lines file
+so answers survive restarts and are shared by every process using the file.
+The file is compacted when it outgrows its size limit.
+An embedding index maps reworded questions onto the cached answers.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def make_key(*parts: str) -> str:
+    """
+    Build a cache key from the given parts.
+
+    Args:
+        parts: Strings identifying the cached value (e.g. model and question)
+
+    Returns:
+        SHA-256 hex digest of the parts
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier (memory + disk) cache for LLM answers.
+
+    Only the byte offset of each on-disk entry is kept in memory, so cold
+    answers are read back from disk on demand instead of being loaded at start.
+    Entries appended by other processes are indexed when a lookup misses.
+
+    Once the file grows past `max_bytes`, it is rewritten with only the latest
+    fresh entry of each key, newest first up to half the limit, and replaced
+    atomically; other processes notice the new file and index it again.
+    Entries another process appends while the file is being rewritten may be
+    lost, which only costs a cache miss.
+    """
+
+    def __init__(self,
+                 path: str = "cache/llm_responses.jsonl",
+                 maxsize: int = 1024,
+                 ttl_seconds: Optional[float] = None,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path to the JSON-lines file backing the cache
+            maxsize: Maximum number of entries kept in memory
+            ttl_seconds: Age after which entries are considered stale. If None,
+                entries never expire.
+            max_bytes: File size that triggers a compaction. If None, the file
+                grows without bound.
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._memory: OrderedDict = OrderedDict()
+        self._offsets: Dict[str, int] = {}
+        self._indexed_end = 0  # Size of the file when it was last indexed
+        self._indexed_file: Optional[Tuple[int, int]] = None  # (device, inode) indexed
+        self._lock = threading.Lock()
+        self._load_index()
+
+    @staticmethod
+    def _identity(f: BinaryIO) -> Tuple[int, int]:
+        """Identify an open file, so a replaced (compacted) file is detected."""
+        st = os.fstat(f.fileno())
+        return st.st_dev, st.st_ino
+
+    def _load_index(self) -> None:
+        """Index the offsets of the entries on disk that are not indexed yet."""
+        try:
+            with open(self.path, 'rb') as f:
+                identity = self._identity(f)
+                if identity != self._indexed_file:
+                    # A new or compacted file: its offsets start over
+                    self._offsets.clear()
+                    self._indexed_end = 0
+                    self._indexed_file = identity
+                f.seek(self._indexed_end)
+                offset = f.tell()
+                for line in iter(f.readline, b''):
+                    if not line.endswith(b'\n'):
+                        break  # Still being written; index it next time
+                    try:
+                        self._offsets[json.loads(line)['key']] = offset
+                    except (ValueError, KeyError):
+                        logger.warning(f"Skipping corrupt cache entry in {self.path}")
+                    offset = f.tell()
+                self._indexed_end = offset
+        except FileNotFoundError:
+            pass
+
+    def _has_new_entries(self) -> bool:
+        """Check whether the file grew or was replaced since it was last indexed."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return (st.st_dev, st.st_ino) != self._indexed_file or st.st_size > self._indexed_end
+
+    def _is_fresh(self, timestamp: float) -> bool:
+        """Check whether an entry written at `timestamp` is still valid."""
+        return self.ttl_seconds is None or time.time() - timestamp < self.ttl_seconds
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        """Read an entry from disk, or return None if it is not stored."""
+        offset = self._offsets.get(key)
+        if offset is None:
+            return None
+
+        with open(self.path, 'rb') as f:
+            if self._identity(f) != self._indexed_file:
+                return None  # Compacted since it was indexed; see get
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        """Insert an entry into the in-memory LRU, evicting the oldest if full."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key (see make_key)
+
+        Returns:
+            The cached value, or None if missing or stale
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                entry = self._read_disk(key)
+                if entry is None and self._has_new_entries():
+                    self._load_index()
+                    entry = self._read_disk(key)
+                if entry is None:
+                    return None
+                self._remember(key, entry)
+
+            if not self._is_fresh(entry['timestamp']):
+                return None
+            return entry['value']
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a value in memory and append it to the disk file.
+
+        Args:
+            key: Cache key (see make_key)
+            value: Value to cache
+        """
+        entry = {'key': key, 'value': value, 'timestamp': time.time()}
+
+        with self._lock:
+            self._remember(key, entry)
+
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+
+            # One write per entry, so appends from several processes do not
+            # interleave
+            with open(self.path, 'ab') as f:
+                f.write(json.dumps(entry).encode('utf-8') + b'\n')
+            self._load_index()
+            if self.max_bytes is not None and self._indexed_end > self.max_bytes:
+                self._compact()
+
+    def _compact(self) -> None:
+        """
+        Rewrite the file with the latest fresh entry of each key, keeping the
+        newest entries up to half of max_bytes in their original order.
+        Called with the lock held, right after indexing the file.
+        """
+        latest = {offset: key for key, offset in self._offsets.items()}
+        entries = []  # (timestamp, key, line) of the entries to consider
+        with open(self.path, 'rb') as f:
+            if self._identity(f) != self._indexed_file:
+                return  # Just replaced by another process
+            offset = 0
+            for line in iter(f.readline, b''):
+                if offset >= self._indexed_end:
+                    break
+                key = latest.get(offset)
+                offset = f.tell()
+                if key is None:
+                    continue  # Overwritten by a later entry, or corrupt
+                timestamp = json.loads(line)['timestamp']
+                if self._is_fresh(timestamp):
+                    entries.append((timestamp, key, line))
+
+        keep, used = set(), 0
+        for i in sorted(range(len(entries)), key=lambda i: entries[i][0], reverse=True):
+            used += len(entries[i][2])
+            if used > self.max_bytes // 2:
+                break
+            keep.add(i)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        offsets = {}
+        with open(tmp_path, 'wb') as f:
+            for i, (_, key, line) in enumerate(entries):
+                if i in keep:
+                    offsets[key] = f.tell()
+                    f.write(line)
+            end = f.tell()
+            identity = self._identity(f)
+        os.replace(tmp_path, self.path)
+
+        self._offsets = offsets
+        self._indexed_end = end
+        self._indexed_file = identity
+        logger.info(f"Compacted {self.path} to {len(offsets)} entries ({end} bytes)")
+
+class SemanticIndex:
+    """
+    In-memory nearest-neighbour index from question embeddings to cache keys.
+
+    Lets a reworded question find the cached answer of an earlier one. The
+    unit-normalized embeddings are rows of one float32 matrix, so a lookup is
+    a single matrix-vector product; the least recently matched entries are
+    evicted beyond `maxsize`.
+    """
+
+    def __init__(self, threshold: float = 0.92, maxsize: int = 5000):
+        """
+        Initialize the index.
+
+        Args:
+            threshold: Minimum cosine similarity for two questions to match
+            maxsize: Maximum number of embeddings kept
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[Optional[str]] = []
+        self._rows: OrderedDict = OrderedDict()  # key -> row, oldest first
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def find(self, embedding) -> Optional[str]:
+        """
+        Find the key of the most similar stored question.
+
+        Args:
+            embedding: Embedding of the question
+
+        Returns:
+            The key, or None if no stored question is similar enough
+        """
+        vector = self._normalize(embedding)
+        if vector is None or not self._rows or vector.shape[0] != self._matrix.shape[1]:
+            return None
+
+        similarities = self._matrix[:len(self._keys)] @ vector
+        row = int(np.argmax(similarities))
+        if similarities[row] < self.threshold or self._keys[row] is None:
+            return None
+        key = self._keys[row]
+        self._rows.move_to_end(key)
+        return key
+
+    def add(self, key: str, embedding) -> None:
+        """
+        Store the embedding of the question cached under `key`.
+
+        Args:
+            key: Cache key of the question's answer
+            embedding: Embedding of the question
+        """
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        if self._matrix is None or vector.shape[0] != self._matrix.shape[1]:
+            # First entry, or the embedding model changed: start over
+            self._matrix = np.zeros((min(self.maxsize, 64), vector.shape[0]), dtype=np.float32)
+            self._keys, self._rows = [], OrderedDict()
+
+        row = self._rows.get(key)
+        if row is None:
+            if len(self._rows) >= self.maxsize:
+                _, row = self._rows.popitem(last=False)  # Reuse the oldest row
+            else:
+                row = len(self._keys)
+                self._keys.append(None)
+                if row == self._matrix.shape[0]:
+                    grown = np.zeros((min(self.maxsize, 2 * row), self._matrix.shape[1]), dtype=np.float32)
+                    grown[:row] = self._matrix
+                    self._matrix = grown
+        self._matrix[row] = vector
+        self._keys[row] = key
+        self._rows[key] = row
+        self._rows.move_to_end(key)
@@ -3,16 +3,26 @@ Logging utility for Horse Trainer AI
 
 This module configures the logging for the application.
 """
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import sys
 from datetime import datetime
 from pathlib import Path
 
+# Background thread writing queued records to the real handlers
+_listener = None
+
 def setup_logger(level='INFO', log_file=None):
     """
     Set up the logger for the application.
     
+    Logging calls only put the record on a queue; the console and file
+    handlers run on a background listener thread, so callers never wait on
+    the writes. Call stop_logger to flush and stop it (done at exit).
+    
     Args:
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Path to the log file. If None, logs will only go to console.
@@ -30,6 +40,7 @@ def setup_logger(level='INFO', log_file=None):
     logger.setLevel(numeric_level)
     
     # Remove existing handlers to avoid duplication in case of reconfiguration
+    stop_logger()
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
     
@@ -43,7 +54,7 @@ def setup_logger(level='INFO', log_file=None):
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(numeric_level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # Create file handler if log_file is specified
     if log_file:
@@ -55,10 +66,28 @@ def setup_logger(level='INFO', log_file=None):
         file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Route everything through the queue
+    global _listener
+    log_queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
     
     return logger
 
+def stop_logger():
+    """Write out any queued log records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(stop_logger)
+
 def get_default_log_file():
     """
     Get the default log file path.
@@ -0,0 +1,70 @@
+"""
+Rate limiting utilities for Horse Trainer AI
+
+This module provides an asyncio token bucket used to keep calls to the OpenAI
+API under the account's requests-per-minute and tokens-per-minute limits, so
+excess requests wait their turn instead of failing with 429s.
+"""
+import asyncio
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `capacity` tokens per `period`.
+
+    Waiters are served in arrival order: the first one holds the bucket while
+    it sleeps until enough tokens are available.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        """
+        Initialize the bucket, full.
+
+        Args:
+            capacity: Maximum number of tokens (e.g. requests or tokens per minute)
+            period: Seconds it takes to refill the bucket from empty
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Wait until `amount` tokens are available and take them.
+
+        Args:
+            amount: Number of tokens to take (capped at the capacity)
+        """
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            # Created lazily so it binds to the running event loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def pause(self, seconds: float) -> None:
+        """
+        Empty the bucket so that nothing is taken for the next `seconds`.
+
+        Used when the API reports the limit was hit anyway (other clients may
+        share the account), to hold back every waiter instead of just the
+        request that failed.
+
+        Args:
+            seconds: Time to wait before tokens become available again
+        """
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self.rate)
@@ -33,20 +33,16 @@ def plot_training_history(horse_profile: HorseProfile, save_path: Optional[str]
         logger.warning(f"No training history for horse {horse_profile.name} (ID: {horse_profile.id})")
         return
     
-    # Convert training history to DataFrame
-    training_df = pd.DataFrame([
-        {
-            'date': session.date,
-            'activity_type': session.activity_type,
-            'duration_minutes': session.duration_minutes,
-            'intensity': session.intensity,
-            'performance_rating': session.performance_rating
-        }
-        for session in horse_profile.training_history
-    ])
-    
-    # Sort by date
-    training_df = training_df.sort_values('date')
+    # Convert training history to DataFrame, one column at a time. The
+    # history is kept sorted by date, so no sort is needed.
+    history = horse_profile.training_history
+    training_df = pd.DataFrame({
+        'date': [session.date for session in history],
+        'activity_type': [session.activity_type for session in history],
+        'duration_minutes': [session.duration_minutes for session in history],
+        'intensity': [session.intensity for session in history],
+        'performance_rating': [session.performance_rating for session in history]
+    })
     
     # Set up plotting style
     set_plotting_style()
@@ -0,0 +1,101 @@
+# tests/test_cache.py
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Add the repository root to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.cache import ResponseCache, make_key
+
+
+class TestMakeKey(unittest.TestCase):
+    """Test building cache keys"""
+
+    def test_parts_are_delimited(self):
+        """Moving text between parts changes the key"""
+        self.assertNotEqual(make_key("ab", "c"), make_key("a", "bc"))
+
+    def test_stable(self):
+        """The same parts always give the same key"""
+        self.assertEqual(make_key("gpt-4o-mini", "What hay?"), make_key("gpt-4o-mini", "What hay?"))
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the memory + disk answer cache"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "llm_responses.jsonl")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_persists_across_instances(self):
+        """Entries written by one instance are read back by another"""
+        ResponseCache(path=self.path).set("k", "v")
+        self.assertEqual(ResponseCache(path=self.path).get("k"), "v")
+
+    def test_sees_entries_of_other_instances(self):
+        """Entries appended by another process are found on a miss"""
+        reader = ResponseCache(path=self.path)
+        ResponseCache(path=self.path).set("k", "v")
+        self.assertEqual(reader.get("k"), "v")
+
+    def test_stale_entries_expire(self):
+        """Entries older than the TTL are misses"""
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"key": "k", "value": "v", "timestamp": time.time() - 3600}) + "\n")
+        self.assertIsNone(ResponseCache(path=self.path, ttl_seconds=60).get("k"))
+        self.assertEqual(ResponseCache(path=self.path).get("k"), "v")
+
+    def test_compaction_bounds_file_size(self):
+        """The file is rewritten with the newest entries once it passes max_bytes"""
+        cache = ResponseCache(path=self.path, max_bytes=2000)
+        for i in range(100):
+            cache.set(f"k{i}", "x" * 50)
+            self.assertLessEqual(os.path.getsize(self.path), 2000)
+
+        reloaded = ResponseCache(path=self.path, max_bytes=2000)
+        self.assertEqual(reloaded.get("k99"), "x" * 50)
+        self.assertIsNone(reloaded.get("k0"))
+
+    def test_compaction_keeps_latest_value(self):
+        """Only the latest entry of a key survives compaction"""
+        cache = ResponseCache(path=self.path, max_bytes=1000)
+        for i in range(20):
+            cache.set("k", f"v{i}")
+        with open(self.path) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([entry["value"] for entry in entries if entry["key"] == "k"][-1], "v19")
+        self.assertLess(len(entries), 20)
+        self.assertEqual(ResponseCache(path=self.path).get("k"), "v19")
+
+    def test_compaction_drops_stale_entries(self):
+        """Entries past the TTL are not rewritten"""
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"key": "old", "value": "v" * 200, "timestamp": time.time() - 3600}) + "\n")
+        cache = ResponseCache(path=self.path, ttl_seconds=60, max_bytes=300)
+        cache.set("new", "x" * 20)
+        with open(self.path) as f:
+            self.assertEqual([json.loads(line)["key"] for line in f], ["new"])
+
+    def test_other_instances_follow_compaction(self):
+        """An instance indexed before another compacted the file reads the new file"""
+        writer = ResponseCache(path=self.path, max_bytes=2000)
+        reader = ResponseCache(path=self.path, maxsize=1)
+        for i in range(10):
+            writer.set(f"k{i}", f"v{i}")
+        self.assertEqual(reader.get("k5"), "v5")
+        for i in range(10, 100):
+            writer.set(f"k{i}", f"v{i}")
+        self.assertEqual(reader.get("k99"), "v99")
+        self.assertEqual(reader.get("k90"), "v90")
+        self.assertIsNone(reader.get("k5"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+# tests/test_data_loader.py
+import os
+import sys
+import tempfile
+import time
+import unittest
+from datetime import date
+
+import orjson
+
+# Add the repository root to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.data_loader import DataLoader
+from src.models.horse_profile import HorseProfile, TrainingSession
+
+
+def make_horse(horse_id, name):
+    """Create a minimal horse profile"""
+    return HorseProfile(
+        id=horse_id,
+        name=name,
+        breed="Quarter Horse",
+        birth_date=date(2016, 4, 1),
+        sex="gelding",
+        color="sorrel",
+        height_hands=15.1,
+        weight_kg=500,
+    )
+
+
+class TestUpsertHorseProfile(unittest.TestCase):
+    """Test adding and replacing single horse profiles"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.loader = DataLoader(data_dir=self._tmp.name)
+        self.loader.save_horse_profiles([make_horse("H001", "Thunder"), make_horse("H002", "Luna")])
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def reloaded(self):
+        """Names by ID, as read back from disk by a fresh loader"""
+        return {horse.id: horse.name for horse in DataLoader(data_dir=self._tmp.name).load_horse_profiles()}
+
+    def test_replace_in_place(self):
+        """Replacing a profile keeps the other ones"""
+        self.loader.upsert_horse_profile(make_horse("H001", "Storm"), horse_id="H001")
+        self.assertEqual(self.reloaded(), {"H001": "Storm", "H002": "Luna"})
+
+    def test_change_id(self):
+        """A profile can move to an unused ID"""
+        self.loader.upsert_horse_profile(make_horse("H003", "Thunder"), horse_id="H001")
+        self.assertEqual(self.reloaded(), {"H003": "Thunder", "H002": "Luna"})
+
+    def test_change_id_to_existing_id(self):
+        """Moving a profile onto another horse's ID fails instead of deleting that horse"""
+        with self.assertRaises(ValueError):
+            self.loader.upsert_horse_profile(make_horse("H002", "Thunder"), horse_id="H001")
+        self.assertEqual(self.reloaded(), {"H001": "Thunder", "H002": "Luna"})
+
+
+
+class TestAppendTrainingSession(unittest.TestCase):
+    """Test appending sessions to a horse's history"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.loader = DataLoader(data_dir=self._tmp.name)
+        self.loader.save_horse_profiles([make_horse("H001", "Thunder"), make_horse("H002", "Luna")])
+        self.session = TrainingSession(date(2024, 3, 1), "trot", 30, "low", 7)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_appended_and_saved(self):
+        """The session is added to the horse and written to disk"""
+        self.assertTrue(self.loader.append_training_session("H001", self.session))
+        reloaded = DataLoader(data_dir=self._tmp.name).load_horse_index()
+        self.assertEqual(reloaded["H001"].training_history, [self.session])
+        self.assertEqual(reloaded["H002"].training_history, [])
+
+    def test_unknown_horse(self):
+        """Appending to an unknown horse changes nothing"""
+        self.assertFalse(self.loader.append_training_session("NOPE", self.session))
+
+    def test_previous_index_unchanged(self):
+        """Readers of the previous index do not see the profile change under them"""
+        before = self.loader.load_horse_index()
+        profile = before["H001"]
+        self.loader.append_training_session("H001", self.session)
+        self.assertEqual(profile.training_history, [])
+        self.assertIs(before["H001"], profile)
+        self.assertEqual(self.loader.load_horse_index()["H001"].training_history, [self.session])
+
+
+class TestProfileSources(unittest.TestCase):
+    """Test choosing between the JSON and msgpack profile files"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self._tmp.name, "horse_profiles.json")
+        self.msgpack_path = os.path.join(self._tmp.name, "horse_profiles.msgpack")
+        self.write_json([make_horse("H001", "Thunder")])
+        self.loader = DataLoader(data_dir=self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_json(self, profiles, mtime=None):
+        """Write profiles to the JSON file, optionally with a given mtime"""
+        with open(self.json_path, "wb") as f:
+            f.write(orjson.dumps([profile.to_encodable() for profile in profiles]))
+        if mtime is not None:
+            os.utime(self.json_path, (mtime, mtime))
+
+    def names(self, loader=None):
+        """Names by ID of the profiles the loader reads"""
+        return {horse.id: horse.name for horse in (loader or self.loader).load_horse_profiles()}
+
+    def test_saved_profiles_read_from_msgpack(self):
+        """Saved profiles are read back from the msgpack file"""
+        self.loader.save_horse_profiles([make_horse("H001", "Storm")])
+        self.assertTrue(os.path.exists(self.msgpack_path))
+        self.assertEqual(self.names(DataLoader(data_dir=self._tmp.name)), {"H001": "Storm"})
+
+    def test_json_edited_after_save(self):
+        """A JSON file modified after the last save is read instead of the msgpack file"""
+        self.loader.save_horse_profiles([make_horse("H001", "Storm")])
+        self.write_json([make_horse("H001", "Edited"), make_horse("H002", "Luna")], mtime=time.time() + 10)
+        self.assertEqual(self.names(), {"H001": "Edited", "H002": "Luna"})
+        self.assertEqual(self.names(DataLoader(data_dir=self._tmp.name)), {"H001": "Edited", "H002": "Luna"})
+
+    def test_corrupt_msgpack_falls_back_to_json(self):
+        """A msgpack file that cannot be decoded does not hide the JSON profiles"""
+        with open(self.msgpack_path, "wb") as f:
+            f.write(b"\xc1 not msgpack")
+        loader = DataLoader(data_dir=self._tmp.name)
+        self.assertEqual(self.names(loader), {"H001": "Thunder"})
+        loader.upsert_horse_profile(make_horse("H002", "Luna"))
+        self.assertEqual(self.names(DataLoader(data_dir=self._tmp.name)), {"H001": "Thunder", "H002": "Luna"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# tests/test_endpoints.py
+import asyncio
+import dataclasses
+import os
+import sys
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+# Add the repository root to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api import endpoints
+from src.data.data_loader import DataLoader
+from src.models.training_model import TrainingModel
+
+
+class TestUpdateHorse(unittest.TestCase):
+    """Test PUT /horses/{horse_id}"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        loader = DataLoader(data_dir=self._tmp.name)
+        loader.create_sample_data()
+        endpoints.app.state.data_loader = loader
+        endpoints._missing_horses.clear()
+        self.client = TestClient(endpoints.app)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_update(self):
+        """A profile can be updated under its own ID"""
+        horse = self.client.get("/horses/H001").json()
+        horse["name"] = "Storm"
+        response = self.client.put("/horses/H001", json=horse)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/horses/H001").json()["name"], "Storm")
+
+    def test_change_id_to_existing_horse(self):
+        """Changing the ID to that of another horse is rejected and both horses are kept"""
+        other = self.client.get("/horses/H002").json()
+        horse = self.client.get("/horses/H001").json()
+        horse["id"] = "H002"
+        response = self.client.put("/horses/H001", json=horse)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get("/horses/H001").status_code, 200)
+        self.assertEqual(self.client.get("/horses/H002").json(), other)
+
+
+
+class TestRecommendations(unittest.TestCase):
+    """Test GET /recommendations"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        loader = DataLoader(data_dir=self._tmp.name)
+        loader.create_sample_data()
+        # Only some horses have lineage, so single-horse batches lack it
+        profile = loader.load_horse_index()["H002"]
+        loader.upsert_horse_profile(dataclasses.replace(profile, lineage={}))
+        endpoints.app.state.data_loader = loader
+        endpoints.app.state.training_model = TrainingModel({})
+        endpoints.app.state.model_trained = asyncio.Event()
+        endpoints.app.state.train_lock = asyncio.Lock()
+        endpoints._missing_horses.clear()
+        self.client = TestClient(endpoints.app)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_all_horses(self):
+        """Recommendations cover the horses with enough confidence"""
+        response = self.client.get("/recommendations")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.json()), 0)
+
+    def test_single_horse_without_lineage(self):
+        """A horse without lineage gets recommendations from the model trained on every horse"""
+        self.assertEqual(self.client.get("/recommendations").status_code, 200)
+        response = self.client.get("/recommendations", params={"horse_id": "H002"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(rec["horse_id"] == "H002" for rec in response.json()))
+
+    def test_single_horse_first(self):
+        """A single-horse request can be the one that trains the model"""
+        response = self.client.get("/recommendations", params={"horse_id": "H002"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_horse(self):
+        """An unknown horse ID is a 404"""
+        self.assertEqual(self.client.get("/recommendations", params={"horse_id": "NOPE"}).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_horse_profile.py
+import os
+import sys
+import unittest
+from datetime import date, timedelta
+
+# Add the repository root to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.horse_profile import HorseProfile, TrainingSession
+
+
+def session(day, notes=None):
+    """A training session on the given day"""
+    return TrainingSession(day, "trot", 30, "low", 7, notes)
+
+
+def make_horse(sessions=()):
+    """Create a minimal horse profile with the given training history"""
+    return HorseProfile(
+        id="H001",
+        name="Thunder",
+        breed="Quarter Horse",
+        birth_date=date(2016, 4, 1),
+        sex="gelding",
+        color="sorrel",
+        height_hands=15.1,
+        weight_kg=500,
+        training_history=list(sessions),
+    )
+
+
+class TestTrainingHistory(unittest.TestCase):
+    """Test keeping the training history sorted by date"""
+
+    def test_sorted_on_creation(self):
+        """A history passed out of order is sorted"""
+        horse = make_horse([session(date(2024, 3, 3)), session(date(2024, 3, 1)), session(date(2024, 3, 2))])
+        self.assertEqual([s.date.day for s in horse.training_history], [1, 2, 3])
+
+    def test_add_keeps_order(self):
+        """Sessions are inserted at their date, not appended"""
+        horse = make_horse([session(date(2024, 3, 1)), session(date(2024, 3, 5))])
+        horse.add_training_session(session(date(2024, 3, 3)))
+        horse.add_training_session(session(date(2024, 2, 1)))
+        horse.add_training_session(session(date(2024, 4, 1)))
+        self.assertEqual(
+            [s.date for s in horse.training_history],
+            [date(2024, 2, 1), date(2024, 3, 1), date(2024, 3, 3), date(2024, 3, 5), date(2024, 4, 1)]
+        )
+
+    def test_same_day_added_last(self):
+        """A session on a day that already has sessions goes after them"""
+        day = date(2024, 3, 1)
+        horse = make_horse([session(day, "first"), session(day, "second"), session(date(2024, 3, 2))])
+        horse.add_training_session(session(day, "third"))
+        self.assertEqual([s.notes for s in horse.training_history], ["first", "second", "third", None])
+
+    def test_first_session_after(self):
+        """The search finds the first session on or strictly after a day"""
+        day = date(2024, 3, 2)
+        horse = make_horse([session(date(2024, 3, 1)), session(day), session(day), session(date(2024, 3, 4))])
+        self.assertEqual(horse._first_session_after(day), 1)
+        self.assertEqual(horse._first_session_after(day, inclusive=False), 3)
+        self.assertEqual(horse._first_session_after(date(2024, 3, 3)), 3)
+        self.assertEqual(horse._first_session_after(date(2024, 1, 1)), 0)
+        self.assertEqual(horse._first_session_after(date(2024, 5, 1)), 4)
+        self.assertEqual(make_horse()._first_session_after(day), 0)
+
+    def test_recent_training_cutoff(self):
+        """Recent training is the sessions from 30 days before the given day on"""
+        day = date(2024, 3, 31)
+        horse = make_horse([session(day - timedelta(days=offset)) for offset in (0, 29, 30, 31, 60)])
+        self.assertEqual([s.date for s in horse.recent_training_on(day)], [date(2024, 3, 1), date(2024, 3, 2), day])
+        self.assertEqual(horse.recent_training_on(date(2025, 1, 1)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
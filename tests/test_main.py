@@ -0,0 +1,56 @@
+# tests/test_main.py
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+# Add the repository root to the path so we can import main
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# main imports web_agent, which builds its client and caches at import time
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("LLM_CACHE_FILE", os.path.join(tempfile.mkdtemp(), "llm_responses.jsonl"))
+
+import main
+
+
+async def fake_batch_response(questions, quality=None, max_tokens=None):
+    return [f"answer to: {question}" for question in questions]
+
+
+@patch("main.generate_batch_response", fake_batch_response)
+class TestAskBatch(unittest.TestCase):
+    """Test validation of /ask_batch requests"""
+
+    def setUp(self):
+        self.client = TestClient(main.app)
+
+    def test_valid_batch(self):
+        """Valid questions are answered in order"""
+        response = self.client.post("/ask_batch", json=["Walk", "Trot"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"responses": ["answer to: Walk", "answer to: Trot"]})
+
+    def test_empty_question_rejected(self):
+        """Every question must be non-empty, as in /ask"""
+        response = self.client.post("/ask_batch", json=["Walk", ""])
+        self.assertEqual(response.status_code, 422)
+
+    def test_overlong_question_rejected(self):
+        """Every question is held to the /ask length limit"""
+        response = self.client.post("/ask_batch", json=["x" * (main.MAX_QUESTION_CHARS + 1)])
+        self.assertEqual(response.status_code, 422)
+
+    def test_too_many_questions_rejected(self):
+        """At most MAX_BATCH_QUESTIONS questions are accepted per request"""
+        response = self.client.post("/ask_batch", json=["Walk"] * (main.MAX_BATCH_QUESTIONS + 1))
+        self.assertEqual(response.status_code, 422)
+        response = self.client.post("/ask_batch", json=["Walk"] * main.MAX_BATCH_QUESTIONS)
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
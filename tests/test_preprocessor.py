@@ -0,0 +1,130 @@
+# tests/test_preprocessor.py
+import math
+import os
+import sys
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from pandas.api.types import is_float_dtype
+
+# Add the repository root to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.preprocessor import DataPreprocessor
+from src.models.horse_profile import HorseProfile, TrainingSession
+
+
+def make_horse(horse_id, sessions=()):
+    """Create a minimal horse profile with the given training sessions"""
+    return HorseProfile(
+        id=horse_id,
+        name=horse_id,
+        breed="Arabian",
+        birth_date=date(2015, 6, 1),
+        sex="mare",
+        color="grey",
+        height_hands=15.0,
+        weight_kg=450,
+        training_history=[
+            TrainingSession(date(2024, 1, i + 1), activity, 30, intensity, rating)
+            for i, (activity, intensity, rating) in enumerate(sessions)
+        ],
+    )
+
+
+def unscaled(preprocessor, method, *args):
+    """The features a preprocessing method builds, before imputing, scaling and encoding"""
+    with patch.object(DataPreprocessor, '_preprocess_dataframe', lambda self, df, fit=False: df):
+        return getattr(preprocessor, method)(*args)
+
+
+class TestHorseFeatures(unittest.TestCase):
+    """Test the per-horse training summaries"""
+
+    def setUp(self):
+        horses = [
+            make_horse("H001", [
+                ("trot", "low", 6), ("trot", "medium", 8), ("jump", "high", 5), ("swim", "low", 10),
+            ]),
+            make_horse("H002"),
+            make_horse("H003", [("canter", "extreme", 9)]),
+        ]
+        self.df = unscaled(DataPreprocessor(), 'preprocess_horse_data', horses).set_index('horse_id')
+
+    def test_average_performance(self):
+        """Ratings are averaged per activity; unsummarized activities are ignored"""
+        self.assertEqual(self.df.loc["H001", "avg_perf_trot"], 7.0)
+        self.assertEqual(self.df.loc["H001", "avg_perf_jump"], 5.0)
+        self.assertTrue(math.isnan(self.df.loc["H001", "avg_perf_canter"]))
+        self.assertEqual(self.df.loc["H003", "avg_perf_canter"], 9.0)
+
+    def test_intensity_shares(self):
+        """Intensities are percentages of all the horse's sessions"""
+        self.assertEqual(list(self.df.loc["H001", DataPreprocessor.INTENSITY_FEATURES]), [50.0, 25.0, 25.0])
+        self.assertEqual(list(self.df.loc["H003", DataPreprocessor.INTENSITY_FEATURES]), [0.0, 0.0, 0.0])
+
+    def test_no_history(self):
+        """A horse without sessions has no averages or shares"""
+        row = self.df.loc["H002", DataPreprocessor.AVG_PERF_FEATURES + DataPreprocessor.INTENSITY_FEATURES]
+        self.assertTrue(row.isna().all())
+
+    def test_scaled_output(self):
+        """Missing summaries are imputed and the output is float32"""
+        df = DataPreprocessor().preprocess_horse_data([make_horse("H001", [("trot", "low", 6)]), make_horse("H002")], fit=True)
+        self.assertFalse(df[DataPreprocessor.AVG_PERF_FEATURES].isna().any().any())
+        self.assertEqual(str(df['avg_perf_trot'].dtype), 'float32')
+        self.assertIn('breed_Arabian', df.columns)
+
+
+class TestTrainingFeatures(unittest.TestCase):
+    """Test the training record features"""
+
+    records = [
+        {'horse_id': 'H001', 'date': '2024-03-04', 'duration_minutes': 30, 'activity_type': 'trot'},
+        {'horse_id': 'H001', 'date': '2023-12-31', 'duration_minutes': 45, 'activity_type': 'jump'},
+        {'horse_id': 'H002', 'date': '2024-02-29', 'duration_minutes': 20, 'activity_type': 'trot'},
+    ]
+
+    def test_date_features(self):
+        """Dates become month, year and day of week (Monday is 0)"""
+        df = unscaled(DataPreprocessor(), 'preprocess_training_data', self.records)
+        self.assertNotIn('date', df.columns)
+        self.assertEqual(list(df['month']), [3, 12, 2])
+        self.assertEqual(list(df['year']), [2024, 2023, 2024])
+        self.assertEqual(list(df['day_of_week']), [0, 6, 3])
+        self.assertEqual(
+            list(df['day_of_week']),
+            [date.fromisoformat(record['date']).weekday() for record in self.records]
+        )
+        self.assertTrue(is_float_dtype(df['day_of_week']))
+
+    def test_missing_date(self):
+        """A record without a date has no date features"""
+        records = self.records[:1] + [{'horse_id': 'H002', 'date': None, 'duration_minutes': 20, 'activity_type': 'trot'}]
+        df = unscaled(DataPreprocessor(), 'preprocess_training_data', records)
+        self.assertTrue(df.loc[1, ['month', 'year', 'day_of_week']].isna().all())
+        self.assertEqual(df.loc[0, 'month'], 3)
+
+    def test_missing_fit_columns_rejected(self):
+        """Transforming data that lacks a column seen at fit time is an error"""
+        preprocessor = DataPreprocessor()
+        preprocessor.preprocess_training_data(self.records, fit=True)
+        records = [{key: value for key, value in record.items() if key != 'duration_minutes'} for record in self.records]
+        with self.assertRaisesRegex(ValueError, "Missing columns seen at fit time: \\['duration_minutes'\\]"):
+            preprocessor.preprocess_training_data(records)
+
+    def test_transform_reuses_fit(self):
+        """Later batches are encoded with the categories seen at fit time"""
+        preprocessor = DataPreprocessor()
+        fitted = preprocessor.preprocess_training_data(self.records, fit=True)
+        df = preprocessor.preprocess_training_data(
+            [{'horse_id': 'H003', 'date': '2024-05-01', 'duration_minutes': 60, 'activity_type': 'swim'}]
+        )
+        self.assertEqual(list(df.columns), list(fitted.columns))
+        self.assertEqual(df.loc[0, 'activity_type_trot'], 0)
+        self.assertEqual(df.loc[0, 'activity_type_jump'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# tests/test_rate_limit.py
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the repository root to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import rate_limit
+from src.utils.rate_limit import TokenBucket
+
+_sleep = asyncio.sleep
+
+
+class FakeClock:
+    """A monotonic clock that asyncio.sleep advances instantly"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        await _sleep(0)
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    """Test waiting for tokens against a fake clock"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        for patcher in (
+            patch.object(rate_limit, "time", self.clock),
+            patch.object(rate_limit.asyncio, "sleep", self.clock.sleep),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_starts_full(self):
+        """A new bucket hands out its whole capacity without waiting"""
+        bucket = TokenBucket(10)
+        for _ in range(10):
+            await bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+    async def test_refill_rate(self):
+        """An empty bucket refills at capacity tokens per period"""
+        bucket = TokenBucket(60, period=30)
+        await bucket.acquire(60)
+        await bucket.acquire(10)
+        self.assertAlmostEqual(self.clock.now, 5.0)
+
+        self.clock.now += 1.5
+        await bucket.acquire(3)
+        self.assertAlmostEqual(self.clock.now, 6.5)
+
+    async def test_refill_stops_at_capacity(self):
+        """Idle time never fills the bucket past its capacity"""
+        bucket = TokenBucket(10, period=10)
+        self.clock.now += 1000
+        await bucket.acquire(10)
+        await bucket.acquire(1)
+        self.assertAlmostEqual(self.clock.now, 1001.0)
+
+    async def test_amount_capped_at_capacity(self):
+        """Asking for more than the capacity waits for a full bucket instead of forever"""
+        bucket = TokenBucket(10, period=10)
+        await bucket.acquire(25)
+        self.assertEqual(self.clock.sleeps, [])
+        await bucket.acquire(25)
+        self.assertAlmostEqual(self.clock.now, 10.0)
+
+    async def test_waiters_served_in_order(self):
+        """A small request does not overtake a larger one that arrived first"""
+        bucket = TokenBucket(10, period=10)
+        await bucket.acquire(10)
+        served = []
+
+        async def take(name, amount):
+            await bucket.acquire(amount)
+            served.append((name, self.clock.now))
+
+        await asyncio.gather(take("large", 5), take("small", 1), take("last", 1))
+        self.assertEqual([name for name, _ in served], ["large", "small", "last"])
+        self.assertAlmostEqual(served[0][1], 5.0)
+        self.assertAlmostEqual(served[-1][1], 7.0)
+
+    async def test_pause_holds_back_every_waiter(self):
+        """After pause nothing is taken until the pause is over, then the rate applies"""
+        bucket = TokenBucket(60, period=60)
+        bucket.pause(10)
+        served = []
+
+        async def take(name):
+            await bucket.acquire()
+            served.append((name, self.clock.now))
+
+        await asyncio.gather(take("first"), take("second"), take("third"))
+        self.assertEqual([name for name, _ in served], ["first", "second", "third"])
+        self.assertEqual([round(now, 6) for _, now in served], [11.0, 12.0, 13.0])
+
+    async def test_shorter_pause_does_not_refill(self):
+        """A pause never shortens an earlier, longer one"""
+        bucket = TokenBucket(60, period=60)
+        bucket.pause(10)
+        bucket.pause(2)
+        await bucket.acquire()
+        self.assertAlmostEqual(self.clock.now, 11.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
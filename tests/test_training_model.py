@@ -0,0 +1,255 @@
+# tests/test_training_model.py
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+# Add the repository root to the path so we can import our modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.data_loader import DataLoader
+from src.models.horse_profile import HorseProfile, MedicalRecord, TrainingSession
+from src.models.training_model import TrainingModel
+
+TODAY = date.today()
+ACTIVITIES = ['canter', 'dressage', 'trot']
+
+
+def make_horse(horse_id, age=8, medical=False, sessions=0):
+    """Create a horse of the given age with recent training sessions"""
+    return HorseProfile(
+        id=horse_id,
+        name=f"Horse {horse_id}",
+        breed="Hanoverian" if int(horse_id[1:]) % 2 else "Arabian",
+        birth_date=date(TODAY.year - age, 1, 1),
+        sex="mare",
+        color="bay",
+        height_hands=15.0 + int(horse_id[1:]) % 3,
+        weight_kg=450 + 10 * int(horse_id[1:]),
+        medical_history=[MedicalRecord(TODAY - timedelta(days=10), "lameness", "rest")] if medical else [],
+        training_history=[
+            TrainingSession(TODAY - timedelta(days=i), ACTIVITIES[i % 3], 30, "medium", 5 + i % 5)
+            for i in range(sessions)
+        ],
+    )
+
+
+def stub_model(model, classes, probs):
+    """Score with fixed activity probabilities instead of a fitted forest"""
+    model.model = SimpleNamespace(classes_=np.array(classes), predict_proba=lambda X: np.array(probs))
+    model.feature_pipeline = SimpleNamespace(transform=lambda X: X)
+    return model
+
+
+def training_records(horses, per_horse=6):
+    """Historical training records for the horses, cycling through ACTIVITIES"""
+    return [
+        {
+            'horse_id': horse.id,
+            'activity_type': ACTIVITIES[(i + j) % 3],
+            'success_rating': 5 + (i + j) % 5,
+            'improvement_score': (i * j) % 3,
+        }
+        for i, horse in enumerate(horses)
+        for j in range(per_horse)
+    ]
+
+
+class TestTopActivities(unittest.TestCase):
+    """Test choosing each horse's most likely activities"""
+
+    classes = ['canter', 'gallop', 'jump', 'trot']
+
+    def recommend(self, probs, max_per_horse=2, min_confidence=0.0):
+        model = TrainingModel({'recommendations': {'max_per_horse': max_per_horse, 'min_confidence': min_confidence}})
+        horses = [make_horse(f"H{i}") for i in range(len(probs))]
+        recommendations = stub_model(model, self.classes, probs).generate_recommendations(horses)
+        return [(r['horse_id'], r['activity_type']) for r in recommendations]
+
+    def test_ordered_by_confidence(self):
+        """Activities are listed from most to least likely"""
+        self.assertEqual(
+            self.recommend([[0.4, 0.1, 0.3, 0.2]], max_per_horse=3),
+            [("H0", "canter"), ("H0", "jump"), ("H0", "trot")]
+        )
+
+    def test_ties_broken_by_class_order(self):
+        """Activities tied at the cutoff are taken, and listed, in class order"""
+        self.assertEqual(
+            self.recommend([[0.25, 0.25, 0.25, 0.25], [0.1, 0.3, 0.3, 0.3], [0.2, 0.2, 0.5, 0.1]]),
+            [("H0", "canter"), ("H0", "gallop"),
+             ("H1", "gallop"), ("H1", "jump"),
+             ("H2", "jump"), ("H2", "canter")]
+        )
+
+    def test_more_slots_than_classes(self):
+        """Every class is listed when max_per_horse exceeds the number of classes"""
+        self.assertEqual(
+            [activity for _, activity in self.recommend([[0.1, 0.2, 0.3, 0.4]], max_per_horse=10)],
+            ['trot', 'jump', 'gallop', 'canter']
+        )
+
+    def test_min_confidence(self):
+        """Activities below the minimum confidence are left out"""
+        self.assertEqual(
+            self.recommend([[0.05, 0.6, 0.3, 0.05], [0.25, 0.25, 0.25, 0.25]], max_per_horse=3, min_confidence=0.26),
+            [("H0", "gallop"), ("H0", "jump")]
+        )
+
+
+class TestSessionPlans(unittest.TestCase):
+    """Test recommended durations and intensities against the documented rules"""
+
+    classes = ['canter', 'dressage', 'gallop', 'groundwork', 'jump', 'swim', 'trail', 'trot']
+
+    def plans(self, horse):
+        model = TrainingModel({'recommendations': {'max_per_horse': len(self.classes), 'min_confidence': 0.0}})
+        probs = [np.linspace(1.0, 0.5, len(self.classes)) / 6]
+        recommendations = stub_model(model, self.classes, probs).generate_recommendations([horse])
+        return {
+            r['activity_type']: (r['recommended_duration'], r['recommended_intensity'])
+            for r in recommendations
+        }
+
+    def test_adult(self):
+        """An adult horse gets each activity's base duration and intensity"""
+        self.assertEqual(self.plans(make_horse("H1", age=8)), {
+            'canter': (20, 'medium'), 'dressage': (40, 'medium'), 'gallop': (15, 'high'),
+            'groundwork': (35, 'low'), 'jump': (25, 'high'), 'swim': (30, 'low'),
+            'trail': (45, 'medium'), 'trot': (30, 'low'),
+        })
+
+    def test_young(self):
+        """Under 3 years sessions are 15 minutes shorter (at least 15) and one level easier"""
+        self.assertEqual(self.plans(make_horse("H1", age=2)), {
+            'canter': (15, 'low'), 'dressage': (25, 'low'), 'gallop': (15, 'medium'),
+            'groundwork': (20, 'low'), 'jump': (15, 'medium'), 'swim': (15, 'low'),
+            'trail': (30, 'low'), 'trot': (15, 'low'),
+        })
+
+    def test_senior_with_medical_conditions(self):
+        """Over 15 years and with medical conditions the cuts add up, the intensity drops once"""
+        self.assertEqual(self.plans(make_horse("H1", age=20, medical=True)), {
+            'canter': (15, 'low'), 'dressage': (20, 'low'), 'gallop': (15, 'medium'),
+            'groundwork': (15, 'low'), 'jump': (15, 'medium'), 'swim': (15, 'low'),
+            'trail': (25, 'low'), 'trot': (15, 'low'),
+        })
+
+    def test_medical_conditions(self):
+        """Medical conditions cut sessions by 10 minutes and lower the intensity"""
+        plans = self.plans(make_horse("H1", age=8, medical=True))
+        self.assertEqual(plans['dressage'], (30, 'low'))
+        self.assertEqual(plans['jump'], (15, 'medium'))
+        self.assertEqual(plans['trail'], (35, 'low'))
+
+    def test_boundary_ages(self):
+        """Horses of exactly 3 and 15 years get the adult plan"""
+        adult = self.plans(make_horse("H1", age=8))
+        self.assertEqual(self.plans(make_horse("H1", age=3)), adult)
+        self.assertEqual(self.plans(make_horse("H1", age=15)), adult)
+
+    def test_types(self):
+        """Durations are plain ints and intensities plain strings"""
+        for duration, intensity in self.plans(make_horse("H1", age=2)).values():
+            self.assertIs(type(duration), int)
+            self.assertIs(type(intensity), str)
+
+
+class TestFeatureMemo(unittest.TestCase):
+    """Test reusing the features of the last batch"""
+
+    def setUp(self):
+        self.model = TrainingModel({})
+        self.horses = [make_horse("H1", sessions=3), make_horse("H2")]
+
+    def test_same_batch_reused(self):
+        """The same profiles on the same day reuse the extracted frame"""
+        features = self.model._extract_features(self.horses)
+        self.assertIs(self.model._extract_features(list(self.horses)), features)
+
+    def test_added_session_invalidates(self):
+        """A session added to a profile gives fresh features"""
+        features = self.model._extract_features(self.horses)
+        self.horses[1].add_training_session(TrainingSession(TODAY, "trot", 30, "low", 7))
+        refreshed = self.model._extract_features(self.horses)
+        self.assertEqual(list(refreshed['recent_training_count']), [3, 1])
+        self.assertEqual(list(features['recent_training_count']), [3, 0])
+
+    def test_appended_through_loader_invalidates(self):
+        """Profiles reloaded after append_training_session give fresh features"""
+        with tempfile.TemporaryDirectory() as data_dir:
+            loader = DataLoader(data_dir=data_dir)
+            loader.save_horse_profiles(self.horses)
+            features = self.model._extract_features(list(loader.load_horse_index().values()))
+            loader.append_training_session("H2", TrainingSession(TODAY, "trot", 30, "low", 7))
+            refreshed = self.model._extract_features(list(loader.load_horse_index().values()))
+        self.assertIsNot(refreshed, features)
+        self.assertEqual(list(refreshed['recent_training_count']), [3, 1])
+        self.assertEqual(list(features['recent_training_count']), [3, 0])
+
+
+class TestTrain(unittest.TestCase):
+    """Test training, saving and loading the models"""
+
+    config = {
+        'model': {'params': {'n_estimators': 20, 'random_state': 0, 'n_jobs': 1}},
+        'recommendations': {'max_per_horse': 3, 'min_confidence': 0.0},
+    }
+
+    def setUp(self):
+        self.horses = [make_horse(f"H{i}", age=2 + 3 * i, medical=i % 4 == 0, sessions=i) for i in range(1, 9)]
+        self.records = training_records(self.horses)
+
+    def test_save_load_round_trip(self):
+        """A loaded model gives the same recommendations as the one saved"""
+        model = TrainingModel(self.config)
+        model.train(self.records, self.horses)
+        expected = model.generate_recommendations(self.horses)
+        self.assertEqual(len(expected), 3 * len(self.horses))
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            path = os.path.join(model_dir, 'model.joblib')
+            model.save_model(path)
+            loaded = TrainingModel(self.config)
+            loaded.load_model(path)
+            self.assertEqual(loaded.generate_recommendations(self.horses), expected)
+            del loaded  # release the memory-mapped arrays before the directory goes
+
+    def test_save_untrained(self):
+        """Saving before training is an error"""
+        with self.assertRaises(ValueError):
+            TrainingModel(self.config).save_model(os.path.join(tempfile.gettempdir(), 'unused.joblib'))
+
+    def test_stratified_split(self):
+        """The split keeps the share of each activity when every activity has enough records"""
+        with patch('src.models.training_model.train_test_split', wraps=train_test_split) as split:
+            TrainingModel(self.config).train(self.records, self.horses)
+        self.assertEqual(split.call_count, 1)
+        self.assertIsNotNone(split.call_args.kwargs['stratify'])
+
+    def test_unstratified_fallback(self):
+        """An activity with a single record falls back to a random split"""
+        records = self.records + [{
+            'horse_id': 'H1', 'activity_type': 'jump', 'success_rating': 8, 'improvement_score': 1,
+        }]
+        model = TrainingModel(self.config)
+        with self.assertLogs('src.models.training_model', 'WARNING') as logs:
+            model.train(records, self.horses)
+        self.assertIn("splitting randomly", logs.output[0])
+        self.assertIsNotNone(model.model)
+        self.assertEqual(len(model.generate_recommendations(self.horses)), 3 * len(self.horses))
+
+    def test_duplicate_horse_ids(self):
+        """Two profiles with the same ID are rejected"""
+        with self.assertRaisesRegex(ValueError, "duplicate horse IDs"):
+            TrainingModel(self.config).train(self.records, self.horses + [make_horse("H1")])
+
+
+if __name__ == '__main__':
+    unittest.main()
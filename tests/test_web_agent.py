@@ -0,0 +1,483 @@
+# tests/test_web_agent.py
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+# Add the repository root to the path so we can import web_agent
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# web_agent builds its client and caches at import time
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ["LLM_CACHE_FILE"] = os.path.join(tempfile.mkdtemp(), "llm_responses.jsonl")
+os.environ["FAQ_FILE"] = os.path.join(tempfile.mkdtemp(), "faq.json")
+
+import web_agent
+from src.utils.cache import ResponseCache, SemanticIndex
+
+
+class FakeOpenAI:
+    """Answers chat completions, embeddings and Batch API requests without the network"""
+
+    def __init__(self, embeddings=None, reply=None):
+        self.embeddings = embeddings or {}
+        self.reply = reply or (lambda body: "answer to: " + body["messages"][-1]["content"])
+        self.completions = []
+        # Batch API: the uploaded request lines, how the batch ends, and the
+        # output record of each request (None leaves it out of the output file)
+        self.uploads = []
+        self.batch_status = "completed"
+        self.batch_output = lambda line: {
+            "status_code": 200,
+            "body": {"choices": [{"index": 0, "message": {"role": "assistant",
+                                                          "content": self.reply(line["body"])}}]},
+        }
+
+    def batch(self, status, output_file_id=None):
+        return {
+            "id": "batch_test", "object": "batch", "endpoint": "/v1/chat/completions",
+            "input_file_id": "file-in", "completion_window": "24h", "created_at": 0,
+            "status": status, "output_file_id": output_file_id,
+        }
+
+    def output_file(self):
+        records = []
+        for line in self.uploads[-1]:
+            response = self.batch_output(line)
+            if response is not None:
+                records.append(json.dumps({"custom_id": line["custom_id"], "response": response}))
+        return "\n".join(records) + "\n"
+
+    def files_and_batches(self, request):
+        path = request.url.path
+        if path.endswith("/files"):
+            # One JSON request per line inside the multipart upload
+            lines = request.content.decode().splitlines()
+            self.uploads.append([json.loads(line) for line in lines if line.startswith('{"custom_id"')])
+            return httpx.Response(200, json={
+                "id": "file-in", "object": "file", "bytes": len(request.content), "created_at": 0,
+                "filename": "questions.jsonl", "purpose": "batch", "status": "processed",
+            })
+        if path.endswith("/batches"):
+            return httpx.Response(200, json=self.batch("in_progress"))
+        if path.endswith("/batches/batch_test"):
+            output = self.output_file() if self.batch_status in ("completed", "expired") else ""
+            return httpx.Response(200, json=self.batch(self.batch_status, "file-out" if output.strip() else None))
+        if path.endswith("/files/file-out/content"):
+            return httpx.Response(200, content=self.output_file().encode())
+        return None
+
+    def __call__(self, request):
+        response = self.files_and_batches(request)
+        if response is not None:
+            return response
+        body = json.loads(request.content)
+        if request.url.path.endswith("/embeddings"):
+            data = [
+                {"object": "embedding", "index": i, "embedding": self.embeddings.get(text, [0.0, 0.0, 1.0])}
+                for i, text in enumerate(body["input"])
+            ]
+            return httpx.Response(200, json={
+                "object": "list", "model": body["model"], "data": data,
+                "usage": {"prompt_tokens": 1, "total_tokens": 1},
+            })
+        self.completions.append(body)
+        if body.get("stream"):
+            reply = self.reply(body)
+            chunks = [reply[i:i + 4] for i in range(0, len(reply), 4)]
+            events = "".join(
+                "data: " + json.dumps({
+                    "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+                }) + "\n\n"
+                for chunk in chunks
+            )
+            return httpx.Response(
+                200, content=(events + "data: [DONE]\n\n").encode(),
+                headers={"content-type": "text/event-stream"},
+            )
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": self.reply(body)},
+            }],
+        })
+
+
+class WebAgentTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs web_agent against a FakeOpenAI with an empty cache"""
+
+    embeddings = {}
+
+    def setUp(self):
+        self.openai = FakeOpenAI(self.embeddings)
+        self._client = web_agent.client
+        web_agent.client = web_agent.client.with_options(
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.openai))
+        )
+        self._tmp = tempfile.TemporaryDirectory()
+        web_agent._cache = ResponseCache(path=os.path.join(self._tmp.name, "llm_responses.jsonl"))
+        web_agent._similar.clear()
+        web_agent._semaphore = None
+        self._faq = web_agent._faq
+
+    def tearDown(self):
+        web_agent.client = self._client
+        web_agent._faq = self._faq
+        self._tmp.cleanup()
+
+
+class TestSemanticCache(WebAgentTestCase):
+    """Test that paraphrases reuse answers only from the same route"""
+
+    embeddings = {
+        "How do I load a horse into a trailer?": [1.0, 0.0, 0.0],
+        "Tips for trailer loading my horse": [0.99, 0.1, 0.0],
+    }
+
+    async def test_paraphrase_reuses_answer(self):
+        """A paraphrase on the same route gets the cached answer"""
+        first = await web_agent.generate_response("How do I load a horse into a trailer?")
+        second = await web_agent.generate_response("Tips for trailer loading my horse")
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.openai.completions), 1)
+
+    async def test_other_model_does_not_reuse_answer(self):
+        """A paraphrase routed to another model gets its own completion"""
+        await web_agent.generate_response("How do I load a horse into a trailer?")
+        await web_agent.generate_response("Tips for trailer loading my horse", quality="high")
+        self.assertEqual(
+            [body["model"] for body in self.openai.completions],
+            [web_agent.FAST_MODEL, web_agent.MODEL],
+        )
+
+    async def test_other_max_tokens_does_not_reuse_answer(self):
+        """A paraphrase asking for another answer length gets its own completion"""
+        await web_agent.generate_response("How do I load a horse into a trailer?")
+        await web_agent.generate_response("Tips for trailer loading my horse", max_tokens=64)
+        self.assertEqual([body["max_tokens"] for body in self.openai.completions], [512, 64])
+
+
+async def collect(events):
+    """The SSE messages of a stream_response, joined"""
+    return "".join([event async for event in events])
+
+
+class TestStreamResponse(WebAgentTestCase):
+    """Test that /ask/stream goes through the same checks as /ask"""
+
+    embeddings = TestSemanticCache.embeddings
+
+    async def test_streams_and_caches_answer(self):
+        """A new question is streamed in chunks and then cached"""
+        events = await collect(web_agent.stream_response("How do I load a horse into a trailer?"))
+        self.assertTrue(events.startswith("data: answ"))
+        self.assertTrue(events.endswith("data: [DONE]\n\n"))
+        answer = "answer to: How do I load a horse into a trailer?"
+        self.assertEqual(await web_agent.generate_response("How do I load a horse into a trailer?"), answer)
+        self.assertEqual(len(self.openai.completions), 1)
+
+    async def test_paraphrase_of_answered_question(self):
+        """A paraphrase of an answered question is sent as one event without a completion"""
+        answer = await web_agent.generate_response("How do I load a horse into a trailer?")
+        events = await collect(web_agent.stream_response("Tips for trailer loading my horse"))
+        self.assertEqual(events, web_agent._sse(answer) + web_agent._sse("[DONE]"))
+        self.assertEqual(len(self.openai.completions), 1)
+
+    async def test_streamed_answer_serves_paraphrases(self):
+        """A streamed answer is indexed for paraphrases too"""
+        await collect(web_agent.stream_response("How do I load a horse into a trailer?"))
+        await web_agent.generate_response("Tips for trailer loading my horse")
+        self.assertEqual(len(self.openai.completions), 1)
+
+    @patch("web_agent.MAX_PROMPT_TOKENS", 20)
+    async def test_prompt_budget(self):
+        """A question over the prompt budget gets an error event without a completion"""
+        events = await collect(web_agent.stream_response("How do I load a horse into a trailer?"))
+        self.assertTrue(events.startswith("event: error\ndata: Error: question exceeds"))
+        self.assertEqual(self.openai.completions, [])
+
+
+class TestFaq(WebAgentTestCase):
+    """Test that curated answers are used only for default requests"""
+
+    embeddings = {"How often should hooves be picked out?": [1.0, 0.0, 0.0]}
+
+    def setUp(self):
+        super().setUp()
+        index = SemanticIndex(threshold=web_agent.FAQ_THRESHOLD, maxsize=1)
+        index.add("0", [1.0, 0.0, 0.0])
+        web_agent._faq = (index, ["Every day, and before and after riding."])
+
+    async def test_default_request_gets_curated_answer(self):
+        """A default request is answered from the FAQ without a completion"""
+        answer = await web_agent.generate_response("How often should hooves be picked out?")
+        self.assertEqual(answer, "Every day, and before and after riding.")
+        self.assertEqual(self.openai.completions, [])
+
+    async def test_high_quality_skips_faq(self):
+        """quality="high" always gets a completion"""
+        await web_agent.generate_response("How often should hooves be picked out?", quality="high")
+        self.assertEqual(len(self.openai.completions), 1)
+
+    async def test_other_max_tokens_skips_faq(self):
+        """A non-default max_tokens gets a completion cut at that length"""
+        await web_agent.generate_response("How often should hooves be picked out?", max_tokens=32)
+        self.assertEqual([body["max_tokens"] for body in self.openai.completions], [32])
+
+    async def test_build_empty_faq(self):
+        """An empty FAQ file has nothing to embed"""
+        path = os.path.join(self._tmp.name, "faq.json")
+        with open(path, "w") as f:
+            json.dump([], f)
+        self.assertEqual(await web_agent.build_faq(path), 0)
+
+
+
+class TestCacheKey(unittest.TestCase):
+    """Test which requests share a cached answer"""
+
+    def test_trivial_rewording_shares_key(self):
+        """Case, punctuation and spacing do not change the key"""
+        self.assertEqual(
+            web_agent._cache_key("How much hay does a horse need?"),
+            web_agent._cache_key("  how much HAY does a horse need "),
+        )
+
+    def test_key_scoped_to_model(self):
+        """Answers of different models are cached separately"""
+        self.assertNotEqual(
+            web_agent._cache_key("What hay?", web_agent.MODEL),
+            web_agent._cache_key("What hay?", web_agent.FAST_MODEL),
+        )
+
+    def test_key_scoped_to_max_tokens(self):
+        """Answers cut at different lengths are cached separately"""
+        self.assertNotEqual(
+            web_agent._cache_key("What hay?", web_agent.MODEL, 64),
+            web_agent._cache_key("What hay?", web_agent.MODEL),
+        )
+
+    def test_key_scoped_to_system_prompt(self):
+        """Changing the system prompt invalidates the cached answers"""
+        key = web_agent._cache_key("What hay?")
+        with patch("web_agent.SYSTEM_PROMPT", "You are a farrier."):
+            self.assertNotEqual(web_agent._cache_key("What hay?"), key)
+
+    def test_other_questions_differ(self):
+        """Different questions never share a key"""
+        self.assertNotEqual(web_agent._cache_key("What hay?"), web_agent._cache_key("What oats?"))
+
+
+class TestChooseModel(unittest.TestCase):
+    """Test routing questions to the fast or the larger model"""
+
+    def test_everyday_questions_use_fast_model(self):
+        """Short questions without health topics go to the fast model"""
+        for question in (
+            "Which plant in my pasture is safe for horses?",
+            "Can you give me an explanation of leg yielding?",
+            "What should I pack for a trail ride?",
+            "How do I teach my horse to stand for the farrier?",
+        ):
+            self.assertEqual(web_agent.choose_model(question), web_agent.FAST_MODEL, question)
+
+    def test_health_questions_use_model(self):
+        """Questions about health topics go to the larger model, in any inflection"""
+        for question in (
+            "Is my horse colicking?",
+            "How long is rehab after a tendon injury?",
+            "My mare seems lame on the left fore",
+            "What dosage of bute is safe?",
+            "Can you write a training plan for a young horse?",
+            "What are the SYMPTOMS of ulcers?",
+        ):
+            self.assertEqual(web_agent.choose_model(question), web_agent.MODEL, question)
+
+    def test_long_or_high_quality_questions_use_model(self):
+        """Long questions and quality="high" always go to the larger model"""
+        self.assertEqual(web_agent.choose_model("What hay?", quality="high"), web_agent.MODEL)
+        self.assertEqual(web_agent.choose_model("x" * web_agent.FAST_MAX_CHARS), web_agent.MODEL)
+
+
+@patch("web_agent.WORKERS", 4)
+class TestRateLimits(unittest.TestCase):
+    """Test splitting the account rate limits across worker processes"""
+
+    def test_worker_share(self):
+        """Each worker gets an equal share, and at least 1"""
+        self.assertEqual(web_agent._worker_share(500), 125)
+        self.assertEqual(web_agent._worker_share(3), 1)
+
+    def test_header_limit(self):
+        """Limits reported in the response headers are split the same way"""
+        headers = {"x-ratelimit-limit-tokens": "30000"}
+        self.assertEqual(web_agent._header_limit(headers, "x-ratelimit-limit-tokens"), 7500)
+        self.assertIsNone(web_agent._header_limit(headers, "x-ratelimit-limit-requests"))
+
+    @patch("web_agent.QPM_LIMIT", 50)
+    @patch("web_agent._semaphore", None)
+    def test_concurrency_limit(self):
+        """In-flight calls are limited per worker to its share of QPM_LIMIT"""
+        self.assertEqual(web_agent._get_semaphore()._value, 12)
+
+
+def batch_questions(body):
+    """The numbered questions of a batched completion request"""
+    content = body["messages"][-1]["content"]
+    if not content.startswith(web_agent.BATCH_INSTRUCTIONS):
+        return None
+    lines = content[len(web_agent.BATCH_INSTRUCTIONS):].split("\n")
+    return [line.split(") ", 1)[1] for line in lines]
+
+
+class TestBatchAnswers(WebAgentTestCase):
+    """Test splitting batched replies into one answer per question"""
+
+    questions = ["How do I teach a horse to lunge?", "How do I teach a horse to back up?"]
+
+    def setUp(self):
+        super().setUp()
+        self.openai.reply = self.reply
+
+    def reply(self, body):
+        questions = batch_questions(body)
+        if questions is None:
+            return "single answer to: " + body["messages"][-1]["content"]
+        return json.dumps({"answers": [f"For {q}:\n1) Start slowly\n2) Reward" for q in questions]})
+
+    def test_parse_batch_answers(self):
+        """Replies are accepted only with exactly one answer per question"""
+        self.assertEqual(web_agent._parse_batch_answers('{"answers": ["a", " b "]}', 2), ["a", "b"])
+        self.assertIsNone(web_agent._parse_batch_answers('{"answers": ["a"]}', 2))
+        self.assertIsNone(web_agent._parse_batch_answers('{"answers": ["a", ""]}', 2))
+        self.assertIsNone(web_agent._parse_batch_answers('{"answers": ["a", "b"', 2))
+        self.assertIsNone(web_agent._parse_batch_answers('["a", "b"]', 2))
+        self.assertIsNone(web_agent._parse_batch_answers(None, 2))
+
+    async def test_answers_containing_numbered_lists(self):
+        """Numbered lists inside an answer stay with that answer"""
+        answers = await web_agent.generate_batch_response(self.questions)
+        self.assertEqual(answers, [f"For {q}:\n1) Start slowly\n2) Reward" for q in self.questions])
+        self.assertEqual(len(self.openai.completions), 1)
+
+    async def test_cached_under_each_question(self):
+        """Each batched answer is cached under its own question's key"""
+        answers = await web_agent.generate_batch_response(self.questions)
+        self.assertEqual(await web_agent.generate_response(self.questions[1]), answers[1])
+        self.assertEqual(len(self.openai.completions), 1)
+
+    async def test_wrong_answer_count_is_not_cached(self):
+        """A reply with too few answers is discarded and each question asked alone"""
+        self.openai.reply = lambda body: (
+            json.dumps({"answers": ["only one"]}) if batch_questions(body) else "alone"
+        )
+        answers = await web_agent.generate_batch_response(self.questions)
+        self.assertEqual(answers, ["alone", "alone"])
+        self.assertEqual(len(self.openai.completions), 3)
+        self.assertEqual(await web_agent.generate_response(self.questions[0]), "alone")
+
+    async def test_invalid_json_is_not_cached(self):
+        """A reply cut off mid-JSON is discarded and each question asked alone"""
+        self.openai.reply = lambda body: '{"answers": ["cut' if batch_questions(body) else "alone"
+        self.assertEqual(await web_agent.generate_batch_response(self.questions), ["alone", "alone"])
+
+
+
+class TestBulkGenerate(WebAgentTestCase):
+    """Test answering questions through the Batch API"""
+
+    questions = ["How do I teach a horse to lunge?", "How do I teach a horse to back up?"]
+
+    async def bulk_generate(self, questions):
+        return await web_agent.bulk_generate(questions, poll_seconds=0)
+
+    def test_request_file(self):
+        """The input file has one chat completion request per question, keyed by its index"""
+        models, _ = web_agent._route(self.questions, None, 64)
+        lines = web_agent._bulk_request_file(self.questions, models, [1], 64).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        request = json.loads(lines[0])
+        self.assertEqual(request["custom_id"], "1")
+        self.assertEqual(request["url"], "/v1/chat/completions")
+        self.assertEqual(request["body"]["model"], models[1])
+        self.assertEqual(request["body"]["max_tokens"], 64)
+        self.assertEqual(request["body"]["messages"][-1]["content"], self.questions[1])
+
+    def test_bulk_results(self):
+        """Only successful requests with text content are answers"""
+        def record(i, status_code, content):
+            body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+            return json.dumps({"custom_id": str(i), "response": {"status_code": status_code, "body": body}})
+
+        text = "\n".join([record(0, 200, "a"), record(1, 500, "b"), record(2, 200, None), "", record(3, 200, "d")])
+        self.assertEqual(web_agent._bulk_results(text), {0: "a", 3: "d"})
+
+    async def test_answers_and_caches(self):
+        """Every question is answered in order, and the answers are cached"""
+        answers = await self.bulk_generate(self.questions)
+        self.assertEqual(answers, ["answer to: " + q for q in self.questions])
+        self.assertEqual(await web_agent.generate_response(self.questions[0]), answers[0])
+        self.assertEqual(self.openai.completions, [])
+
+    async def test_cached_questions_are_not_sent(self):
+        """Only uncached questions are uploaded, and nothing when all are cached"""
+        await web_agent.generate_response(self.questions[0])
+        answers = await self.bulk_generate(self.questions)
+        self.assertEqual(answers, ["answer to: " + q for q in self.questions])
+        self.assertEqual([line["custom_id"] for line in self.openai.uploads[0]], ["1"])
+
+        await self.bulk_generate(self.questions)
+        self.assertEqual(len(self.openai.uploads), 1)
+
+    async def test_partial_output(self):
+        """Questions missing from the output file get an error and are not cached"""
+        self.openai.batch_output = lambda line: (
+            None if line["custom_id"] == "1" else
+            {"status_code": 200, "body": {"choices": [{"message": {"content": "ok"}}]}}
+        )
+        answers = await self.bulk_generate(self.questions)
+        self.assertEqual(answers[0], "ok")
+        self.assertTrue(answers[1].startswith("Error: no answer in batch batch_test"))
+        self.assertIsNone(web_agent._cache.get(web_agent._route(self.questions, None, 512)[1][1]))
+
+    async def test_empty_content_is_not_cached(self):
+        """A successful request without text content is an error, not an answer"""
+        self.openai.batch_output = lambda line: {
+            "status_code": 200, "body": {"choices": [{"message": {"content": None, "refusal": "no"}}]},
+        }
+        answers = await self.bulk_generate(self.questions[:1])
+        self.assertTrue(answers[0].startswith("Error: "))
+        self.assertEqual(await web_agent.generate_response(self.questions[0]), "answer to: " + self.questions[0])
+        self.assertEqual(len(self.openai.completions), 1)
+
+    async def test_failed_batch(self):
+        """A failed or expired batch without output gives errors and caches nothing"""
+        for status in ("failed", "expired"):
+            self.openai.batch_status = status
+            if status == "expired":
+                self.openai.batch_output = lambda line: None
+            answers = await self.bulk_generate(self.questions)
+            self.assertEqual(answers, [f"Error: no answer in batch batch_test ({status})"] * 2)
+        self.assertEqual(len(self.openai.uploads), 2)
+        self.assertEqual(web_agent._lookup_answers(web_agent._route(self.questions, None, 512)[1]), [None, None])
+
+    async def test_expired_batch_keeps_finished_answers(self):
+        """Requests an expired batch finished are still used"""
+        self.openai.batch_status = "expired"
+        self.openai.batch_output = lambda line: (
+            None if line["custom_id"] == "1" else
+            {"status_code": 200, "body": {"choices": [{"message": {"content": "ok"}}]}}
+        )
+        answers = await self.bulk_generate(self.questions)
+        self.assertEqual(answers, ["ok", "Error: no answer in batch batch_test (expired)"])
+
+
+if __name__ == '__main__':
+    unittest.main()
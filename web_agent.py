@@ -1,23 +1,686 @@
 #!/usr/bin/env python3
-from dotenv import load_dotenv  # Add this import
-from openai import OpenAI
+import asyncio
+import functools
+import json
+import logging
 import os
+import re
+from collections import OrderedDict
+
+import anyio
+import httpx
+import numpy as np
+from dotenv import load_dotenv  # Add this import
+from openai import AsyncOpenAI, AuthenticationError, DefaultAsyncHttpxClient, RateLimitError
+
+from src.utils.cache import ResponseCache, SemanticIndex, make_key
+from src.utils.rate_limit import TokenBucket
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a ~4 characters/token estimate
+    tiktoken = None
+
+# Logged lazily (%-style) so skipped levels cost nothing on the request path
+logger = logging.getLogger(__name__)
 
 # Load .env file from HOME directory
 load_dotenv(os.path.expanduser('~/.env'))  # Critical fix
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))  # Now will work
+# One shared client for the whole process: keepalive + HTTP/2 multiplexing keep
+# TLS handshakes off the request path. Retries are handled by _create_completion
+# so backoff and concurrency share one policy.
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=100),
+    ),
+)
+
+MODEL = "gpt-4-turbo"  # For long or involved questions, and quality="high"
+FAST_MODEL = "gpt-4o-mini"  # For everything else
+FAST_MAX_CHARS = 240  # Longer questions go to MODEL
+# Topics whose answers are worth the larger model, matched as whole words
+# (patterns, so "injur\w*" also covers "injured" and "injuries")
+HARD_KEYWORDS = (
+    r"colic\w*", r"lame(?:ness)?", r"laminitis", r"injur\w*", r"wound\w*", r"diagnos\w*",
+    r"symptoms?", r"medicat\w*", r"dos(?:e|es|ed|age|ing)", r"surgery", r"surgical",
+    r"rehab\w*", r"founder(?:ed)?", r"ulcers?", r"chok(?:e|ed|es|ing)", r"seizures?",
+    r"plans?", r"planning",
+)
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Worker processes serving the app, each with its own share of the rate
+# limits. main.py starts this many; set WEB_CONCURRENCY when starting the
+# app some other way (e.g. the uvicorn command line).
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+# Max in-flight OpenAI calls across all workers (each process gets its share)
+QPM_LIMIT = int(os.getenv("OPENAI_QPM_LIMIT", "50"))
+# Account rate limits (requests / tokens per minute), split across WORKERS;
+# unset means read from the API at startup (see warm_up)
+RPM_LIMIT = int(os.environ["OPENAI_RPM_LIMIT"]) if "OPENAI_RPM_LIMIT" in os.environ else None
+TPM_LIMIT = int(os.environ["OPENAI_TPM_LIMIT"]) if "OPENAI_TPM_LIMIT" in os.environ else None
+MAX_ANSWER_TOKENS = 512  # Default cap on the length of an answer
+MAX_OUTPUT_TOKENS = 4096  # Longest completion MODEL can generate
+# Cut an answer off where the model would start inventing a follow-up question
+STOP_SEQUENCES = ["\n\nQ:", "\n\nQuestion:"]
+MAX_RETRIES = 5
+MAX_BATCH_SIZE = 8  # Questions marshaled into a single completion
+MAX_PROMPT_TOKENS = 2048  # Prompt budget per completion (system + user content)
+BULK_POLL_SECONDS = 60  # How often bulk_generate checks on a Batch API job
+
+SYSTEM_PROMPT = (
+    "You are an experienced horse trainer. Give practical, safe advice on "
+    "training, handling, nutrition and care, and recommend a veterinarian or "
+    "farrier when a question calls for one."
+)
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+# Every request starts with the same byte-identical prefix (system prompt,
+# then the batch instructions for batched calls), which OpenAI caches
+# automatically once long enough; a shared prompt_cache_key routes the
+# requests to the servers holding that cache
+PROMPT_CACHE_KEY = "horse-trainer-ai"
+# Batched answers come back as JSON, so answers that contain numbered lists
+# of their own cannot be mistaken for the next answer
+BATCH_INSTRUCTIONS = (
+    "Answer each numbered question separately. Reply with a JSON object "
+    '{"answers": [...]} holding one answer string per question, in order.\n'
+)
+
+# Answers keyed by (model, system prompt, question); repeats skip the network entirely
+_cache = ResponseCache(
+    path=os.getenv("LLM_CACHE_FILE", "cache/llm_responses.jsonl"),
+    ttl_seconds=float(os.environ["LLM_CACHE_TTL"]) if "LLM_CACHE_TTL" in os.environ else None,
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+# Embeddings of answered questions, so paraphrases find the cached answer.
+# One index per route (model, max_tokens), so a paraphrase never gets an
+# answer written by another model or cut at another length; the least
+# recently used routes are dropped past MAX_SEMANTIC_ROUTES.
+SEMANTIC_THRESHOLD = float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.92"))
+MAX_SEMANTIC_ROUTES = 16
+_similar = OrderedDict()
+
+# Curated answers to common questions: FAQ_FILE holds a JSON list of
+# {"question", "answer"} entries and the .npy file next to it their question
+# embeddings (see build_faq). A close enough question gets the curated answer
+# without any completion, unless it asked for quality="high" or a non-default
+# max_tokens: curated answers are written to the default length.
+FAQ_FILE = os.getenv("FAQ_FILE", "faq/faq.json")
+FAQ_THRESHOLD = float(os.getenv("FAQ_THRESHOLD", "0.83"))
+
+def _faq_embeddings_path(path):
+    return os.path.splitext(path)[0] + ".npy"
+
+def _load_faq(path):
+    """Index the curated answers and their embeddings, or return None if there are none."""
+    try:
+        with open(path, "rb") as f:
+            entries = json.load(f)
+        embeddings = np.load(_faq_embeddings_path(path))
+    except FileNotFoundError:
+        return None
+    if len(entries) != len(embeddings):
+        logger.warning("Ignoring %s: %d entries but %d embeddings", path, len(entries), len(embeddings))
+        return None
+
+    index = SemanticIndex(threshold=FAQ_THRESHOLD, maxsize=max(len(entries), 1))
+    for i, embedding in enumerate(embeddings):
+        index.add(str(i), embedding)
+    return index, [entry["answer"] for entry in entries]
+
+_faq = _load_faq(FAQ_FILE)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_HARD_KEYWORDS_RE = re.compile(r"\b(?:" + "|".join(HARD_KEYWORDS) + r")\b", re.IGNORECASE)
+
+_semaphore = None
+
+# Completions wait here for their share of the rate limits instead of
+# starting and failing with a 429
+def _worker_share(limit):
+    """This process's share of an account-wide rate limit."""
+    return max(1, limit // WORKERS)
+
+_request_bucket = TokenBucket(_worker_share(RPM_LIMIT)) if RPM_LIMIT else None
+_token_bucket = TokenBucket(_worker_share(TPM_LIMIT)) if TPM_LIMIT else None
+
+def _get_semaphore():
+    """Create the concurrency gate lazily so it binds to the running event loop."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(_worker_share(QPM_LIMIT))
+    return _semaphore
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    """Load the tokenizer for MODEL once, or None if it is unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except Exception as e:
+        logger.warning("Could not load tiktoken encoding for %s: %s", MODEL, e)
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def count_tokens(text):
+    """Count (or, without tiktoken, estimate) the tokens in `text`."""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def _messages(content):
+    """Build the message list for a user prompt."""
+    return [SYSTEM_MESSAGE, {"role": "user", "content": content}]
+
+def _normalize_question(question):
+    """Reduce a question to lowercase words, so trivial rewordings share a cache entry."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", question.lower()).split())
+
+def _cache_key(question, model=MODEL, max_tokens=MAX_ANSWER_TOKENS):
+    parts = [model, SYSTEM_PROMPT, _normalize_question(question)]
+    if max_tokens != MAX_ANSWER_TOKENS:
+        parts.append(str(max_tokens))  # Answers cut at another length
+    return make_key(*parts)
+
+def choose_model(question, quality=None):
+    """
+    Pick the model for a question: FAST_MODEL for short, everyday questions
+    and MODEL for long or health-related ones, or always with quality="high".
+    """
+    if quality == "high" or len(question) >= FAST_MAX_CHARS:
+        return MODEL
+    if _HARD_KEYWORDS_RE.search(question):
+        return MODEL
+    return FAST_MODEL
+
+async def _acquire_rate_limits(messages, max_tokens):
+    """Wait until the rate limits allow a completion for the messages."""
+    if _request_bucket is not None:
+        await _request_bucket.acquire()
+    if _token_bucket is not None:
+        tokens = sum(count_tokens(message["content"]) for message in messages)
+        await _token_bucket.acquire(tokens + max_tokens)
+
+def _retry_after(error, default):
+    """Seconds to wait after a 429, from its Retry-After header if present."""
+    try:
+        return float(error.response.headers["retry-after"])
+    except (AttributeError, KeyError, ValueError):
+        return default
+
+def _log_usage(response):
+    """Log how many prompt tokens were served from OpenAI's prompt cache."""
+    usage = getattr(response, "usage", None)
+    if usage is None or not logger.isEnabledFor(logging.DEBUG):
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    logger.debug("Prompt tokens: %d (%d cached)", usage.prompt_tokens, cached)
+
+async def _create_completion(model=MODEL, max_tokens=MAX_ANSWER_TOKENS, **kwargs):
+    """Call the chat completions API, backing off exponentially on 429s."""
+    kwargs.update(max_tokens=max_tokens, stop=STOP_SEQUENCES)
+    delay = 1
+    async with _get_semaphore():
+        for attempt in range(MAX_RETRIES):
+            await _acquire_rate_limits(kwargs["messages"], max_tokens)
+            try:
+                response = await client.chat.completions.create(
+                    model=model, extra_body={"prompt_cache_key": PROMPT_CACHE_KEY}, **kwargs
+                )
+            except RateLimitError as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                # Hold back every queued completion, not just this one
+                wait = _retry_after(e, delay)
+                for bucket in (_request_bucket, _token_bucket):
+                    if bucket is not None:
+                        bucket.pause(wait)
+                await asyncio.sleep(wait)
+                delay *= 2
+                continue
+            _log_usage(response)
+            return response
+
+def _header_limit(headers, name):
+    """Per-worker share of a rate limit reported in the response headers, or None."""
+    try:
+        limit = int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return _worker_share(limit)
+
+async def warm_up():
+    """
+    Send a 1-token completion to open the connection pool and check the key.
+
+    When OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT are not set, the rate-limit
+    buckets are sized from the account limits reported in the response
+    headers for MODEL (the tighter tier), split across WORKERS. Returns the limits in effect.
+    """
+    global _request_bucket, _token_bucket
+    try:
+        raw = await client.with_options(timeout=10).chat.completions.with_raw_response.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": "."}],
+            max_tokens=1,
+        )
+    except AuthenticationError as e:
+        logger.error("OpenAI rejected the API key: %s", e)
+        return {}
+    except Exception as e:
+        logger.warning("OpenAI warm-up request failed: %s", e)
+        return {}
+
+    if _request_bucket is None:
+        rpm = _header_limit(raw.headers, "x-ratelimit-limit-requests")
+        if rpm:
+            _request_bucket = TokenBucket(rpm)
+    if _token_bucket is None:
+        tpm = _header_limit(raw.headers, "x-ratelimit-limit-tokens")
+        if tpm:
+            _token_bucket = TokenBucket(tpm)
+
+    limits = {
+        "requests_per_minute": _request_bucket.capacity if _request_bucket else None,
+        "tokens_per_minute": _token_bucket.capacity if _token_bucket else None,
+    }
+    logger.info("OpenAI client ready (rate limits: %s)", limits)
+    return limits
+
+async def _embed(texts):
+    """Embed the texts, or return None if the embeddings API call fails."""
+    try:
+        async with _get_semaphore():
+            response = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    except Exception as e:
+        logger.warning("Could not embed questions for the semantic cache: %s", e)
+        return None
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+def _faq_applies(quality, max_tokens):
+    """Whether curated answers may stand in for a completion with these settings."""
+    return quality != "high" and max_tokens == MAX_ANSWER_TOKENS
+
+def _faq_answer(embedding):
+    """Curated answer to a question similar to the embedded one, or None."""
+    if _faq is None:
+        return None
+    index, answers = _faq
+    key = index.find(embedding)
+    return answers[int(key)] if key is not None else None
+
+def _similar_index(route, create=False):
+    """The semantic index of a (model, max_tokens) route, or None if it has none yet."""
+    index = _similar.get(route)
+    if index is not None:
+        _similar.move_to_end(route)
+    elif create:
+        index = _similar[route] = SemanticIndex(threshold=SEMANTIC_THRESHOLD)
+        if len(_similar) > MAX_SEMANTIC_ROUTES:
+            _similar.popitem(last=False)
+    return index
+
+def _find_similar(route, embedding):
+    """Cache key of an answered question similar to the embedded one, on the same route."""
+    index = _similar_index(route)
+    return index.find(embedding) if index is not None else None
+
+async def _lookup_similar(embeddings, routes, faq=True):
+    """
+    Look up curated (if `faq`) or cached answers of questions similar to the
+    embedded ones, answered on the same (model, max_tokens) routes (None
+    where missing).
+    """
+    curated = [_faq_answer(embedding) if faq else None for embedding in embeddings]
+    keys = [
+        _find_similar(route, embedding) if answer is None else None
+        for embedding, route, answer in zip(embeddings, routes, curated)
+    ]
+    cached = await anyio.to_thread.run_sync(
+        lambda: [_cache.get(key) if key is not None else None for key in keys]
+    )
+    return [answer if answer is not None else hit for answer, hit in zip(curated, cached)]
 
-def generate_response(prompt):
+def _remember_similar(keys, routes, embeddings, answers):
+    """Index the embeddings of the questions that got an answer, by route and cache key."""
+    for key, route, embedding, answer in zip(keys, routes, embeddings, answers):
+        if answer:
+            _similar_index(route, create=True).add(key, embedding)
+
+async def _known_answer(prompt, key, model, quality, max_tokens):
+    """
+    Look for an answer that needs no completion, as /ask and /ask/stream
+    both do: the cached answer to the same question, then (within the
+    prompt budget) a cached answer to a similar one or a curated answer.
+
+    Returns (answer or None, the question's embedding or None). Raises
+    ValueError if the question exceeds MAX_PROMPT_TOKENS.
+    """
+    cached = await anyio.to_thread.run_sync(_cache.get, key)
+    if cached is not None:
+        return cached, None
+
+    if count_tokens(SYSTEM_PROMPT) + count_tokens(prompt) > MAX_PROMPT_TOKENS:
+        raise ValueError(f"question exceeds the {MAX_PROMPT_TOKENS}-token prompt limit")
+
+    # A reworded earlier question may already have an answer
+    embeddings = await _embed([prompt])
+    if embeddings is None:
+        return None, None
+    similar = (await _lookup_similar(
+        embeddings, [(model, max_tokens)], faq=_faq_applies(quality, max_tokens)
+    ))[0]
+    return similar, embeddings[0]
+
+async def generate_response(prompt, quality=None, max_tokens=MAX_ANSWER_TOKENS):
+    model = choose_model(prompt, quality)
+    key = _cache_key(prompt, model, max_tokens)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[{"role": "user", "content": prompt}]
+        answer, embedding = await _known_answer(prompt, key, model, quality, max_tokens)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    if answer is not None:
+        return answer
+
+    return await _answer_question(prompt, key, model, max_tokens, embedding)
+
+async def _answer_question(prompt, key, model, max_tokens, embedding=None):
+    """Answer one question with its own completion and cache the answer."""
+    try:
+        response = await _create_completion(
+            model=model,
+            max_tokens=max_tokens,
+            messages=_messages(prompt)
         )
-        return response.choices[0].message.content
+        answer = response.choices[0].message.content
     except Exception as e:
         return f"Error: {str(e)}"
 
+    await anyio.to_thread.run_sync(_cache.set, key, answer)
+    if embedding is not None:
+        _remember_similar([key], [(model, max_tokens)], [embedding], [answer])
+    return answer
+
+def _sse(data, event=None):
+    """Format `data` as a Server-Sent Event (multi-line data gets one field per line)."""
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+async def stream_response(prompt, quality=None, max_tokens=MAX_ANSWER_TOKENS):
+    """
+    Yield the answer as Server-Sent Events while it is being generated.
+
+    Questions go through the same checks as generate_response first. A
+    cached, similar or curated answer is sent as a single event; a streamed
+    one is assembled as it arrives and cached once complete.
+    """
+    model = choose_model(prompt, quality)
+    key = _cache_key(prompt, model, max_tokens)
+    try:
+        answer, embedding = await _known_answer(prompt, key, model, quality, max_tokens)
+    except ValueError as e:
+        yield _sse(f"Error: {str(e)}", event="error")
+        yield _sse("[DONE]")
+        return
+    if answer is not None:
+        yield _sse(answer)
+        yield _sse("[DONE]")
+        return
+
+    parts = []
+    try:
+        stream = await _create_completion(
+            model=model,
+            max_tokens=max_tokens,
+            messages=_messages(prompt),
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield _sse(parts[-1])
+    except Exception as e:
+        yield _sse(f"Error: {str(e)}", event="error")
+    else:
+        if parts:
+            answer = "".join(parts)
+            await anyio.to_thread.run_sync(_cache.set, key, answer)
+            if embedding is not None:
+                _remember_similar([key], [(model, max_tokens)], [embedding], [answer])
+    yield _sse("[DONE]")
+
+def _parse_batch_answers(text, count):
+    """
+    Read the answers out of a batched reply ('{"answers": [...]}'), or
+    return None unless it holds exactly `count` non-empty answers.
+    """
+    try:
+        answers = json.loads(text)["answers"]
+    except (TypeError, ValueError, KeyError):
+        return None
+    if not isinstance(answers, list) or len(answers) != count:
+        return None
+    if not all(isinstance(answer, str) and answer.strip() for answer in answers):
+        return None
+    return [answer.strip() for answer in answers]
+
+def _lookup_answers(keys):
+    """Look up cached answers by cache key (None where missing)."""
+    return [_cache.get(key) for key in keys]
+
+def _store_answers(keys, answers):
+    """Cache every non-empty answer under its question's key."""
+    for key, answer in zip(keys, answers):
+        if answer:
+            _cache.set(key, answer)
+
+async def _answer_batch(questions, keys, model, max_tokens, embeddings=None):
+    """
+    Answer a planned batch of questions with a single completion.
+
+    A reply that does not hold one answer per question (cut short, or not
+    valid JSON) is discarded and the questions are answered one by one, so
+    a misaligned answer is never cached under another question's key.
+    """
+    numbered = "\n".join(f"{i}) {q}" for i, q in enumerate(questions, start=1))
+    try:
+        response = await _create_completion(
+            model=model,
+            max_tokens=min(max_tokens * len(questions), MAX_OUTPUT_TOKENS),
+            messages=_messages(BATCH_INSTRUCTIONS + numbered),
+            response_format={"type": "json_object"},
+        )
+        answers = _parse_batch_answers(response.choices[0].message.content, len(questions))
+    except Exception as e:
+        return [f"Error: {str(e)}"] * len(questions)
+
+    if answers is None:
+        logger.warning("Batched reply did not hold %d answers; asking them one by one", len(questions))
+        return list(await asyncio.gather(*(
+            _answer_question(question, key, model, max_tokens, embedding)
+            for question, key, embedding in zip(questions, keys, embeddings or [None] * len(questions))
+        )))
+
+    await anyio.to_thread.run_sync(_store_answers, keys, answers)
+    if embeddings is not None:
+        _remember_similar(keys, [(model, max_tokens)] * len(keys), embeddings, answers)
+    return answers
+
+def _plan_batches(questions, indices):
+    """
+    Group question indices into batches that respect both MAX_BATCH_SIZE and
+    MAX_PROMPT_TOKENS, spilling into a new batch when either would be exceeded.
+    """
+    base_tokens = count_tokens(SYSTEM_PROMPT) + count_tokens(BATCH_INSTRUCTIONS)
+    batches, current, used = [], [], base_tokens
+    for i in indices:
+        tokens = count_tokens(questions[i]) + 2  # "N) " prefix and newline
+        if current and (len(current) == MAX_BATCH_SIZE or used + tokens > MAX_PROMPT_TOKENS):
+            batches.append(current)
+            current, used = [], base_tokens
+        current.append(i)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _route(questions, quality, max_tokens):
+    """Choose the model of every question and the cache key of its answer."""
+    models = [choose_model(question, quality) for question in questions]
+    keys = [_cache_key(question, model, max_tokens) for question, model in zip(questions, models)]
+    return models, keys
+
+async def generate_batch_response(questions, quality=None, max_tokens=MAX_ANSWER_TOKENS):
+    """Answer many questions, marshaling cache misses into concurrent batched calls."""
+    models, keys = _route(questions, quality, max_tokens)
+    answers = await anyio.to_thread.run_sync(_lookup_answers, keys)
+    misses = [i for i, answer in enumerate(answers) if answer is None]
+
+    # Answer reworded earlier questions from the cache too, embedding all the
+    # misses in one call
+    embeddings = await _embed([questions[i] for i in misses]) if misses else None
+    if embeddings is not None:
+        similar = await _lookup_similar(
+            embeddings,
+            [(models[i], max_tokens) for i in misses],
+            faq=_faq_applies(quality, max_tokens),
+        )
+        embedding_of = {}
+        for i, embedding, answer in zip(misses, embeddings, similar):
+            answers[i] = answer
+            embedding_of[i] = embedding
+        misses = [i for i in misses if answers[i] is None]
+
+    # Questions for different models go into different batches
+    batches = []
+    for model in dict.fromkeys(models[i] for i in misses):
+        batches.extend(_plan_batches(questions, [i for i in misses if models[i] == model]))
+    results = await asyncio.gather(*(
+        _answer_batch(
+            [questions[i] for i in batch],
+            [keys[i] for i in batch],
+            models[batch[0]],
+            max_tokens,
+            [embedding_of[i] for i in batch] if embeddings is not None else None,
+        )
+        for batch in batches
+    ))
+    for batch, batch_answers in zip(batches, results):
+        for i, answer in zip(batch, batch_answers):
+            answers[i] = answer
+    return answers
+
+def _bulk_request_file(questions, models, indices, max_tokens):
+    """Render the Batch API input file: one chat completion request per question."""
+    lines = (
+        json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": models[i],
+                "messages": _messages(questions[i]),
+                "max_tokens": max_tokens,
+                "stop": STOP_SEQUENCES,
+                "prompt_cache_key": PROMPT_CACHE_KEY,
+            },
+        })
+        for i in indices
+    )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def _bulk_results(text):
+    """Map custom_id to answer for the successful requests of a Batch API output file."""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        # A refusal or tool call has no text content; treat it as unanswered
+        content = response["body"]["choices"][0]["message"].get("content")
+        if isinstance(content, str) and content.strip():
+            results[int(record["custom_id"])] = content
+    return results
+
+async def bulk_generate(questions, quality=None, max_tokens=MAX_ANSWER_TOKENS, poll_seconds=BULK_POLL_SECONDS):
+    """
+    Answer many questions through the OpenAI Batch API.
+
+    For offline jobs (dataset generation, evaluations) that can wait: the
+    Batch API finishes within 24 hours at half the price of regular calls.
+    Cached questions are not sent, and the answers are cached. Questions
+    whose request failed get an "Error: ..." answer.
+    """
+    models, keys = _route(questions, quality, max_tokens)
+    answers = await anyio.to_thread.run_sync(_lookup_answers, keys)
+    misses = [i for i, answer in enumerate(answers) if answer is None]
+    if not misses:
+        return answers
+
+    try:
+        input_file = await client.files.create(
+            file=("questions.jsonl", _bulk_request_file(questions, models, misses, max_tokens)),
+            purpose="batch",
+        )
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logger.info("Submitted %d questions as batch %s", len(misses), batch.id)
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(poll_seconds)
+            batch = await client.batches.retrieve(batch.id)
+
+        results = {}
+        if batch.output_file_id:
+            output = await client.files.content(batch.output_file_id)
+            results = _bulk_results(output.text)
+    except Exception as e:
+        error = f"Error: {str(e)}"
+        return [error if answer is None else answer for answer in answers]
+
+    if batch.status != "completed":
+        logger.warning("Batch %s ended as %s", batch.id, batch.status)
+    answered = [i for i in misses if i in results]
+    await anyio.to_thread.run_sync(
+        _store_answers, [keys[i] for i in answered], [results[i] for i in answered]
+    )
+    for i in misses:
+        answers[i] = results.get(i, f"Error: no answer in batch {batch.id} ({batch.status})")
+    return answers
+
+async def build_faq(path=FAQ_FILE, chunk_size=1000):
+    """
+    Embed the questions of a curated FAQ file (run at deploy time).
+
+    Writes the embeddings next to `path` as a float32 .npy matrix, one row
+    per entry, and returns the number of entries.
+    """
+    with open(path, "rb") as f:
+        questions = [entry["question"] for entry in json.load(f)]
+    if not questions:
+        return 0
+
+    embeddings = []
+    for start in range(0, len(questions), chunk_size):
+        response = await client.embeddings.create(
+            model=EMBEDDING_MODEL, input=questions[start:start + chunk_size]
+        )
+        embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+    np.save(_faq_embeddings_path(path), np.asarray(embeddings, dtype=np.float32).reshape(len(questions), -1))
+    return len(questions)
+
 if __name__ == "__main__":
     user_input = input("You: ")
-    print("AI:", generate_response(user_input))
+    print("AI:", asyncio.run(generate_response(user_input)))